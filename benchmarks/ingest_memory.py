@@ -0,0 +1,109 @@
+"""Peak Python memory of the streaming reader vs json.load as input grows.
+
+Runs load_data's real ingest path (reader, iter_row_batches, copy_rows)
+against a stub connection whose COPY drains the CSV buffer, so no
+database is needed.
+
+    python benchmarks/ingest_memory.py --videos 500 --steps 4
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from load_data import copy_rows, iter_row_batches
+from video_stream import iter_videos
+from synth import generate_videos, write_dataset
+
+
+class StubCursor:
+    """DB-API cursor that accepts any statement and reads COPY input to the end."""
+
+    def execute(self, sql, params=None):
+        pass
+
+    def copy_expert(self, sql, buffer):
+        while buffer.read(1 << 16):
+            pass
+
+    def close(self):
+        pass
+
+
+class StubConnection:
+    def __init__(self):
+        # SQLAlchemy's Connection.connection is the DB-API connection.
+        self.connection = self
+
+    def cursor(self):
+        return StubCursor()
+
+
+class StubSession:
+    """Just enough of a Session for copy_rows: session.connection().connection.cursor()."""
+
+    def __init__(self):
+        self._connection = StubConnection()
+
+    def connection(self):
+        return self._connection
+
+
+def json_load(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data["videos"] if isinstance(data, dict) else data
+
+
+def measure(read, path, batch_size):
+    session = StubSession()
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = 0
+    for videos, snapshots in iter_row_batches(read(path), batch_size):
+        copy_rows(session, videos, snapshots)
+        rows += len(videos) + len(snapshots)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, peak, elapsed
+
+
+def check_formats(tmp):
+    expected = list(generate_videos(20, 5))
+    for fmt, name in (("array", "a.json"), ("object", "o.json"), ("ndjson", "n.ndjson"), ("ndjson", "n.json")):
+        path = os.path.join(tmp, name)
+        write_dataset(path, 20, 5, fmt)
+        assert list(iter_videos(path, chunk_size=97)) == expected, f"{fmt} ({name}) mismatch"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=500, help="videos at the smallest step")
+    parser.add_argument("--snapshots", type=int, default=24)
+    parser.add_argument("--steps", type=int, default=4, help="each step doubles the input")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        check_formats(tmp)
+        print(f"{'videos':>8}{'file MiB':>10}{'stream peak MiB':>17}{'json.load peak MiB':>20}{'stream s':>10}")
+        for step in range(args.steps):
+            n_videos = args.videos * 2 ** step
+            path = os.path.join(tmp, f"videos_{n_videos}.json")
+            write_dataset(path, n_videos, args.snapshots, "object")
+            _, stream_peak, stream_time = measure(iter_videos, path, args.batch_size)
+            _, load_peak, _ = measure(json_load, path, args.batch_size)
+            print(f"{n_videos:>8}{os.path.getsize(path) / 2**20:>10.1f}"
+                  f"{stream_peak / 2**20:>17.1f}{load_peak / 2**20:>20.1f}{stream_time:>10.2f}")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
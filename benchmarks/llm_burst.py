@@ -0,0 +1,130 @@
+"""Upstream LLM calls under a burst of trending questions, with and without coalescing.
+
+Starts a local fake OpenAI-compatible server (aiohttp) and fires a burst
+of concurrent questions through nl_to_sql's model path: a handful of
+distinct questions, each asked many times with different casing and
+spacing. Then makes the server fail and shows the circuit breaker
+cutting upstream traffic.
+
+    python benchmarks/llm_burst.py --requests 500 --distinct 5 --latency-ms 300
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from aiohttp import web
+
+import nl_to_sql
+from llm import CircuitBreaker, LLMGateway, OpenAIBackend
+
+
+TRENDING = [
+    "Сколько видео набрали больше {n} лайков и меньше 10 комментариев?",
+    "Какое среднее число просмотров у видео креатора {n}?",
+    "Сколько креаторов опубликовали больше {n} видео?",
+    "Какой максимальный прирост лайков за час у видео {n}?",
+    "Сколько видео без единого комментария набрали {n} просмотров?",
+]
+
+
+class FakeProvider:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.fail = False
+        self.calls = 0
+
+    async def handle(self, request):
+        self.calls += 1
+        await request.json()
+        await asyncio.sleep(self.latency)
+        if self.fail:
+            return web.json_response({"error": "overloaded"}, status=503)
+        return web.json_response({"choices": [{"message": {"content": "SELECT COUNT(*) FROM videos;"}}]})
+
+
+def burst_questions(total: int, distinct: int, rng):
+    bases = [TRENDING[i % len(TRENDING)].format(n=1000 * (i + 1)) for i in range(distinct)]
+    questions = []
+    for _ in range(total):
+        question = rng.choice(bases)
+        if rng.random() < 0.5:
+            question = question.upper()
+        if rng.random() < 0.5:
+            question = "  " + question.replace(" ", "  ")
+        questions.append(question)
+    return questions
+
+
+async def run_burst(gateway, questions):
+    nl_to_sql.gateway = gateway
+    started = time.perf_counter()
+    answers = await asyncio.gather(*(nl_to_sql.generate_sql_with_ai_async(q) for q in questions))
+    elapsed = time.perf_counter() - started
+    fallbacks = sum(answer == nl_to_sql.FALLBACK_SQL for answer in answers)
+    return elapsed, fallbacks
+
+
+async def main_async(args):
+    provider = FakeProvider(args.latency_ms / 1000)
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", provider.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+    base_url = f"http://127.0.0.1:{args.port}/v1"
+
+    def gateway(single_flight: bool, breaker=None):
+        return LLMGateway(
+            OpenAIBackend("fake", base_url, pool_size=args.pool),
+            timeout=args.timeout, max_concurrency=args.pool,
+            breaker=breaker or CircuitBreaker(failure_threshold=10**9),
+            single_flight=single_flight,
+        )
+
+    rng = random.Random(7)
+    questions = burst_questions(args.requests, args.distinct, rng)
+    print(f"burst: {args.requests} requests, {args.distinct} distinct questions, "
+          f"{args.latency_ms:.0f} ms provider latency, pool {args.pool}\n")
+    print(f"{'setup':<16}{'upstream':>10}{'fallbacks':>11}{'seconds':>9}")
+    for name, single_flight in (("no coalescing", False), ("single-flight", True)):
+        provider.calls = 0
+        gw = gateway(single_flight)
+        elapsed, fallbacks = await run_burst(gw, questions)
+        print(f"{name:<16}{provider.calls:>10}{fallbacks:>11}{elapsed:>9.2f}")
+        await gw.close()
+
+    # Provider outage: distinct questions so coalescing cannot help.
+    provider.fail = True
+    outage = [f"{question} #{i}" for i, question in enumerate(questions)]
+    print(f"\nprovider returning 503 for {len(outage)} distinct questions")
+    print(f"{'setup':<16}{'upstream':>10}{'fallbacks':>11}{'seconds':>9}")
+    for name, breaker in (("no breaker", CircuitBreaker(failure_threshold=10**9)),
+                          ("breaker", CircuitBreaker(failure_threshold=5, reset_timeout=30))):
+        provider.calls = 0
+        gw = gateway(True, breaker)
+        elapsed, fallbacks = await run_burst(gw, outage)
+        print(f"{name:<16}{provider.calls:>10}{fallbacks:>11}{elapsed:>9.2f}")
+        await gw.close()
+
+    await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--distinct", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--pool", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Push simulated concurrent messages through the bot dispatcher.
+
+The LLM and the database are replaced by blocking sleeps, so the numbers
+show how the dispatcher behaves when those calls are slow. Run from the
+repository root:
+
+    python benchmarks/load_test.py --messages 500 --chats 100
+    python benchmarks/load_test.py --baseline   # old inline handler
+    python benchmarks/load_test.py --jitter-ms 200   # uneven model latency
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:TEST-load-test-token")
+
+from aiogram import Bot, Dispatcher, types
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage
+
+import nl_to_sql
+import bot as bot_module
+
+
+class FakeSession(BaseSession):
+    """Answers Telegram API calls locally and records reply times."""
+
+    def __init__(self):
+        super().__init__()
+        self.replies = {}
+        self.order = []
+        self.busy = 0
+
+    async def make_request(self, bot, method, timeout=None):
+        if isinstance(method, SendMessage):
+            if method.text == bot_module.BUSY_REPLY:
+                self.busy += 1
+            else:
+                self.replies[int(method.text)] = time.perf_counter()
+                self.order.append((method.chat_id, int(method.text)))
+            return types.Message(
+                message_id=1,
+                date=datetime.now(),
+                chat=types.Chat(id=method.chat_id, type="private"),
+                text=method.text,
+            )
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def install_stubs(llm_ms: float, db_ms: float, jitter_ms: float = 0):
+    def fake_nl_to_sql(question: str) -> str:
+        time.sleep(llm_ms / 1000)
+        return f"SELECT {question.rsplit('#', 1)[1]};"
+
+    def fake_to_query(question: str):
+        return fake_nl_to_sql(question), None
+
+    async def fake_to_query_async(question: str):
+        # The model call is awaited on the loop (see llm.LLMGateway), not run in a thread.
+        await asyncio.sleep((llm_ms + random.uniform(0, jitter_ms)) / 1000)
+        return f"SELECT {question.rsplit('#', 1)[1]};", None
+
+    def fake_execute(sql: str, params=None) -> int:
+        time.sleep(db_ms / 1000)
+        return int(sql.split()[1].rstrip(";"))
+
+    nl_to_sql.natural_language_to_sql = fake_nl_to_sql
+    nl_to_sql.question_to_query = fake_to_query
+    nl_to_sql.question_to_query_async = fake_to_query_async
+    nl_to_sql.execute_sql_and_get_number = fake_execute
+    nl_to_sql.warm_up = lambda: None
+
+
+def baseline_dispatcher() -> Dispatcher:
+    dp = Dispatcher()
+
+    @dp.message()
+    async def handle_question(message: types.Message):
+        sql = nl_to_sql.natural_language_to_sql(message.text.strip())
+        await message.answer(str(nl_to_sql.execute_sql_and_get_number(sql)))
+
+    return dp
+
+
+def make_update(n: int, chat_id: int) -> types.Update:
+    return types.Update(
+        update_id=n,
+        message=types.Message(
+            message_id=n,
+            date=datetime.now(),
+            chat=types.Chat(id=chat_id, type="private"),
+            from_user=types.User(id=chat_id, is_bot=False, first_name="load"),
+            text=f"Сколько видео набрало больше 1000 просмотров? #{n}",
+        ),
+    )
+
+
+def out_of_order(order) -> int:
+    """Replies that arrived after a reply to a later question from the same chat."""
+    latest, count = {}, 0
+    for chat_id, n in order:
+        if n < latest.get(chat_id, -1):
+            count += 1
+        latest[chat_id] = max(n, latest.get(chat_id, -1))
+    return count
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(args):
+    install_stubs(args.llm_ms, args.db_ms, args.jitter_ms)
+    session = FakeSession()
+    bot = Bot(token=os.environ["TELEGRAM_BOT_TOKEN"], session=session)
+    dp = baseline_dispatcher() if args.baseline else bot_module.dp
+
+    await dp.emit_startup(bot=bot)
+    sent = {}
+    started = time.perf_counter()
+    tasks = []
+    for n in range(args.messages):
+        sent[n] = time.perf_counter()
+        tasks.append(asyncio.create_task(dp.feed_update(bot, make_update(n, n % args.chats))))
+        if args.interval_ms:
+            await asyncio.sleep(args.interval_ms / 1000)
+    await asyncio.gather(*tasks)
+
+    while len(session.replies) + session.busy < args.messages:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    await dp.emit_shutdown(bot=bot)
+
+    latencies = [(session.replies[n] - sent[n]) * 1000 for n in session.replies]
+    mode = "baseline (inline)" if args.baseline else "scheduler"
+    print(f"mode:       {mode}")
+    print(f"messages:   {args.messages} from {args.chats} chats")
+    print(f"answered:   {len(latencies)}, busy replies: {session.busy}")
+    print(f"reordered:  {out_of_order(session.order)} replies within a chat")
+    print(f"throughput: {len(latencies) / elapsed:.1f} answers/s")
+    if latencies:
+        print(f"p50:        {statistics.median(latencies):.1f} ms")
+        print(f"p99:        {percentile(latencies, 99):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--llm-ms", type=float, default=50)
+    parser.add_argument("--db-ms", type=float, default=5)
+    parser.add_argument("--jitter-ms", type=float, default=0,
+                        help="add up to this many ms to each model call, so answers can overtake")
+    parser.add_argument("--interval-ms", type=float, default=0)
+    parser.add_argument("--baseline", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
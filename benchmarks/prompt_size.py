@@ -0,0 +1,107 @@
+"""Prompt size and model latency: fixed prompt vs retrieved few-shot prompt.
+
+Sends questions that no template answers through nl_to_sql's model path
+with a stub backend whose latency grows with the prompt's estimated
+token count (prefill cost), once with the fixed prompt and once with
+prompt.PromptBuilder.
+
+    python benchmarks/prompt_size.py --ms-per-token 0.5 --base-ms 40
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import nl_to_sql
+from llm import FakeBackend, LLMGateway
+from prompt import PromptBuilder, estimate_tokens, fixed_prompt
+from templates import match_template
+
+
+QUESTIONS = [
+    "Какое среднее количество лайков у видео креатора с id aca1061a9d324ecf8c3fa2bb32d7be63?",
+    "Какое минимальное число лайков среди видео креатора с id aca1061a9d324ecf8c3fa2bb32d7be63?",
+    "Какое максимальное число просмотров у одного видео?",
+    "Сколько у креатора с id cd87be38b50b4fdd8342bb3c383f3c7d видео без лайков?",
+    "Сколько видео без единой жалобы?",
+    "Какой максимальный прирост лайков за час был у одного видео?",
+    "Какое среднее число жалоб на одно видео?",
+    "Сколько замеров статистики было сделано для видео креатора с id cd87be38b50b4fdd8342bb3c383f3c7d?",
+    "Какой самый большой прирост комментариев за один замер?",
+    "Какое максимальное число жалоб у одного видео?",
+    "Сколько замеров статистики показали падение лайков у видео креатора с id aca1061a9d324ecf8c3fa2bb32d7be63?",
+    "Какое среднее число комментариев у видео, опубликованных в ноябре 2025?",
+]
+
+
+class TokenLatencyBackend(FakeBackend):
+    def __init__(self, base_ms: float, ms_per_token: float):
+        super().__init__(reply="SELECT COUNT(*) FROM videos;")
+        self.base_ms = base_ms
+        self.ms_per_token = ms_per_token
+
+    async def complete(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        self.calls += 1
+        await asyncio.sleep((self.base_ms + self.ms_per_token * estimate_tokens(prompt)) / 1000)
+        return self.reply
+
+
+async def measure(builder, questions, backend):
+    nl_to_sql.prompt_builder = builder
+    nl_to_sql.gateway = LLMGateway(backend, timeout=60)
+    tokens, latencies, build_ms = [], [], []
+    for question in questions:
+        started = time.perf_counter()
+        prompt = nl_to_sql.build_prompt(question)
+        build_ms.append((time.perf_counter() - started) * 1000)
+        tokens.append(estimate_tokens(prompt))
+
+        started = time.perf_counter()
+        await nl_to_sql.generate_sql_with_ai_async(question)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return tokens, latencies, build_ms
+
+
+async def main_async(args):
+    template_answered = [q for q in QUESTIONS if match_template(q) is not None]
+    if template_answered:
+        print(f"warning: {len(template_answered)} questions match a template and would not reach the model")
+
+    builder = PromptBuilder(top_k=args.top_k, token_budget=args.token_budget)
+    print(f"{len(QUESTIONS)} questions, stub latency {args.base_ms:.0f} ms + {args.ms_per_token} ms/token\n")
+    print(f"{'prompt':<10}{'avg tokens':>12}{'max tokens':>12}{'p50 ms':>9}{'mean ms':>9}{'build ms':>10}")
+    results = {}
+    for name, prompt_builder in (("fixed", None), ("retrieval", builder)):
+        backend = TokenLatencyBackend(args.base_ms, args.ms_per_token)
+        tokens, latencies, build_ms = await measure(prompt_builder, QUESTIONS, backend)
+        results[name] = (statistics.mean(tokens), statistics.mean(latencies))
+        print(f"{name:<10}{statistics.mean(tokens):>12.0f}{max(tokens):>12}"
+              f"{statistics.median(latencies):>9.1f}{statistics.mean(latencies):>9.1f}"
+              f"{statistics.mean(build_ms):>10.3f}")
+
+    (fixed_tokens, fixed_ms), (retrieval_tokens, retrieval_ms) = results["fixed"], results["retrieval"]
+    print(f"\nprompt tokens -{100 * (1 - retrieval_tokens / fixed_tokens):.0f}%, "
+          f"model latency -{100 * (1 - retrieval_ms / fixed_ms):.0f}%")
+
+    if args.show:
+        question = QUESTIONS[0]
+        print("\n--- fixed ---\n" + fixed_prompt(question))
+        print("--- retrieval ---\n" + builder.build(question))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-ms", type=float, default=40)
+    parser.add_argument("--ms-per-token", type=float, default=0.5)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--token-budget", type=int, default=600)
+    parser.add_argument("--show", action="store_true", help="print both prompts for the first question")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Deterministic Postgres fixture for the replay benchmark.
+
+Drops and recreates the public schema of the target database, applies
+migrations/*.sql in order and loads a synth.py dataset through
+load_data. The fixture's parameters are kept in ingest_meta so an
+unchanged fixture is reused instead of rebuilt.
+"""
+import os
+import tempfile
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from synth import write_dataset
+
+
+def fixture_key(videos: int, snapshots: int, seed: int) -> str:
+    return f"synth:{videos}:{snapshots}:{seed}"
+
+
+def current_fixture(engine):
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT value FROM ingest_meta WHERE key = 'replay_fixture'")).scalar()
+    except SQLAlchemyError:
+        return None
+
+
+def reset_schema(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE; CREATE SCHEMA public;"))
+
+
+def ensure_fixture(engine, videos: int, snapshots: int, seed: int = 42, rebuild: bool = False) -> bool:
+    """Build the fixture unless the database already holds this exact one; True if rebuilt."""
+    key = fixture_key(videos, snapshots, seed)
+    if not rebuild and current_fixture(engine) == key:
+        return False
+
+    reset_schema(engine)
+    # load_data applies migrations/*.sql before loading.
+    import load_data
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "videos.json")
+        write_dataset(path, videos, snapshots, seed=seed)
+        load_data.load_data(path, mode="copy")
+
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO ingest_meta (key, value) VALUES ('replay_fixture', :key)
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = NOW()
+        """), {"key": key})
+    return True
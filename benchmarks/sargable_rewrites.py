@@ -0,0 +1,81 @@
+"""Correctness and speed of sql_rewrite.make_sargable on model-style predicates.
+
+Exits 1 when a rewrite differs from the expected SQL or raises: predicates
+that are not real dates or carry extra digits must come back unchanged.
+
+    python benchmarks/sargable_rewrites.py --rounds 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sql_rewrite import make_sargable
+
+
+# (predicate, expected rewrite)
+CASES = [
+    ("EXTRACT(YEAR FROM video_created_at) = 2025 AND EXTRACT(MONTH FROM video_created_at) = 6",
+     "video_created_at >= '2025-06-01 00:00:00+00' AND video_created_at < '2025-07-01 00:00:00+00'"),
+    ("EXTRACT(MONTH FROM created_at) = 12 AND EXTRACT(YEAR FROM created_at) = 2025",
+     "created_at >= '2025-12-01 00:00:00+00' AND created_at < '2026-01-01 00:00:00+00'"),
+    ("EXTRACT(YEAR FROM vs.created_at) = 2025",
+     "vs.created_at >= '2025-01-01 00:00:00+00' AND vs.created_at < '2026-01-01 00:00:00+00'"),
+    ("DATE(created_at) = '2025-11-28'",
+     "created_at >= '2025-11-28 00:00:00+00' AND created_at < '2025-11-29 00:00:00+00'"),
+    ("created_at::date = '2025-11-28'",
+     "created_at >= '2025-11-28 00:00:00+00' AND created_at < '2025-11-29 00:00:00+00'"),
+    ("video_created_at <= '2025-11-05 23:59:59+00'",
+     "video_created_at < '2025-11-06 00:00:00+00'"),
+    ("NOT EXTRACT(MONTH FROM created_at) = 11 AND EXTRACT(YEAR FROM created_at) = 2025",
+     "NOT (created_at >= '2025-11-01 00:00:00+00' AND created_at < '2025-12-01 00:00:00+00')"),
+    # Not real dates: left for Postgres to reject (or match nothing).
+    ("EXTRACT(YEAR FROM created_at) = 2025 AND EXTRACT(MONTH FROM created_at) = 13",
+     "created_at >= '2025-01-01 00:00:00+00' AND created_at < '2026-01-01 00:00:00+00' "
+     "AND EXTRACT(MONTH FROM created_at) = 13"),
+    ("DATE(created_at) = '2025-11-31'", "DATE(created_at) = '2025-11-31'"),
+    ("created_at::date = '2025-02-30'", "created_at::date = '2025-02-30'"),
+    ("video_created_at <= '2025-11-31 23:59:59+00'", "video_created_at <= '2025-11-31 23:59:59+00'"),
+    ("EXTRACT(YEAR FROM video_created_at) = 0000", "EXTRACT(YEAR FROM video_created_at) = 0000"),
+    # Extra digits are not a year or month.
+    ("EXTRACT(YEAR FROM video_created_at) = 20250", "EXTRACT(YEAR FROM video_created_at) = 20250"),
+    ("EXTRACT(YEAR FROM created_at) = 2025 AND EXTRACT(MONTH FROM created_at) = 110",
+     "created_at >= '2025-01-01 00:00:00+00' AND created_at < '2026-01-01 00:00:00+00' "
+     "AND EXTRACT(MONTH FROM created_at) = 110"),
+    # Already sargable.
+    ("creator_id = 'X' AND views_count > 10000", "creator_id = 'X' AND views_count > 10000"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=1000)
+    args = parser.parse_args()
+
+    wrong = []
+    for predicate, expected in CASES:
+        sql = f"SELECT COUNT(*) FROM videos WHERE {predicate};"
+        try:
+            got = make_sargable(sql)
+        except Exception as e:
+            got = f"raised {e!r}"
+        if got != f"SELECT COUNT(*) FROM videos WHERE {expected};":
+            wrong.append((predicate, expected, got))
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        for predicate, _ in CASES:
+            make_sargable(f"SELECT COUNT(*) FROM videos WHERE {predicate};")
+    elapsed = time.perf_counter() - started
+
+    print(f"cases:       {len(CASES)}")
+    print(f"per rewrite: {elapsed / (args.rounds * len(CASES)) * 1e6:.1f} us")
+    for predicate, expected, got in wrong:
+        print(f"MISMATCH {predicate}\n  expected {expected}\n  got      {got}")
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Deterministic synthetic videos.json generator.
+
+    python benchmarks/synth.py /tmp/videos.json --videos 35800 --snapshots 48
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+
+START = datetime(2025, 11, 1, tzinfo=timezone.utc)
+
+
+def _hex_id(rng: random.Random) -> str:
+    return f"{rng.getrandbits(128):032x}"
+
+
+def _creators(rng: random.Random, n_videos: int, n_creators: int = None):
+    return [_hex_id(rng) for _ in range(n_creators or max(1, n_videos // 20))]
+
+
+def creator_ids(n_videos: int, n_creators: int = None, seed: int = 42):
+    """The creator ids generate_videos() draws its videos' creators from."""
+    return _creators(random.Random(seed), n_videos, n_creators)
+
+
+def generate_videos(n_videos: int, snapshots_per_video: int = 24, n_creators: int = None,
+                    seed: int = 42, start: datetime = START):
+    """Yield video dicts shaped like data/videos.json, one at a time."""
+    rng = random.Random(seed)
+    creators = _creators(rng, n_videos, n_creators)
+
+    for _ in range(n_videos):
+        video_id = _hex_id(rng)
+        created = start - timedelta(days=rng.randint(0, 180), minutes=rng.randint(0, 1439))
+        first_snapshot = max(start, created.replace(minute=0, second=0) + timedelta(hours=1))
+
+        totals = {"views_count": 0, "likes_count": 0, "comments_count": 0, "reports_count": 0}
+        snapshots = []
+        for hour in range(snapshots_per_video):
+            deltas = {
+                "views_count": rng.choice((-1, 0, 5, 20, 100, 1000)) * rng.randint(0, 3),
+                "likes_count": rng.randint(0, 10),
+                "comments_count": rng.randint(0, 3),
+                "reports_count": 1 if rng.random() < 0.01 else 0,
+            }
+            for key, delta in deltas.items():
+                totals[key] = max(0, totals[key] + delta)
+            snapshots.append({
+                "id": _hex_id(rng),
+                "video_id": video_id,
+                "created_at": (first_snapshot + timedelta(hours=hour)).isoformat(),
+                **totals,
+                **{f"delta_{key}": delta for key, delta in deltas.items()},
+            })
+
+        yield {
+            "id": video_id,
+            "creator_id": rng.choice(creators),
+            "video_created_at": created.isoformat(),
+            **totals,
+            "snapshots": snapshots,
+        }
+
+
+def write_dataset(path: str, n_videos: int, snapshots_per_video: int = 24,
+                  fmt: str = "array", seed: int = 42):
+    """Stream a dataset to disk without holding it in memory.
+
+    ``fmt`` is "array" (bare list), "object" ({"videos": [...]}) or "ndjson".
+    """
+    videos = generate_videos(n_videos, snapshots_per_video, seed=seed)
+    with open(path, "w", encoding="utf-8") as f:
+        if fmt == "ndjson":
+            for video in videos:
+                f.write(json.dumps(video, ensure_ascii=False))
+                f.write("\n")
+            return
+
+        f.write('{"videos": [' if fmt == "object" else "[")
+        for i, video in enumerate(videos):
+            if i:
+                f.write(",\n")
+            f.write(json.dumps(video, ensure_ascii=False))
+        f.write("]}" if fmt == "object" else "]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--videos", type=int, default=358)
+    parser.add_argument("--snapshots", type=int, default=24)
+    parser.add_argument("--format", choices=("array", "object", "ndjson"), default="array")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    write_dataset(args.path, args.videos, args.snapshots, args.format, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Throughput and hit rate of the template matcher on paraphrased questions.
+
+Exits 1 when a corpus question routes to the wrong template, or when a
+prompt.EXAMPLES question is answered by a template (the model would never
+see it).
+
+    python benchmarks/template_matcher.py --rounds 2000
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from prompt import EXAMPLES
+from templates import match_template
+
+
+# (question, expected template or None when the LLM should handle it)
+CORPUS = [
+    ("Сколько всего видео есть в системе?", "total_videos"),
+    ("сколько  всего   видео?", "total_videos"),
+    ("Сколько видео получило лайки?", "got_metric"),
+    ("Сколько видео получили хотя бы один комментарий?", "got_metric"),
+    ("Сколько роликов получили жалобы?", "got_metric"),
+    ("Сколько видео набрало больше 100000 просмотров за всё время?", "threshold"),
+    ("Сколько видео набрали более 100 000 просмотров?", "threshold"),
+    ("Сколько видео имеют свыше 5 000 лайков?", "threshold"),
+    ("Сколько видео набрало меньше 10 просмотров?", "threshold"),
+    ("Сколько видео у креатора с id aca1061a9d324ecf8c3fa2bb32d7be63 набрали больше 10 000 просмотров по итоговой статистике?", "creator_threshold"),
+    ("Сколько видео у креатора с id 8b76e572635b400c9052286a56176e03 набрали больше 500 лайков?", "creator_threshold"),
+    ("У креатора с id cd87be38b50b4fdd8342bb3c383f3c7d сколько видео с более чем 1000 просмотров?", "creator_threshold"),
+    ("Сколько видео опубликовал креатор с id 8b76e572635b400c9052286a56176e03 в период с 1 ноября 2025 по 5 ноября 2025 включительно?", "creator_published"),
+    ("Сколько видео у креатора с id aca1061a9d324ecf8c3fa2bb32d7be63 вышло с 1 по 5 ноября 2025?", "creator_published"),
+    ("Сколько видео опубликовал креатор с id aca1061a9d324ecf8c3fa2bb32d7be63 в октябре 2025?", "creator_published"),
+    ("Сколько видео у креатора с id example123?", "creator_videos"),
+    ("Сколько всего есть замеров статистики (по всем видео), в которых число просмотров за час оказалось отрицательным?", "negative_deltas"),
+    ("Сколько замеров с отрицательным приростом лайков?", "negative_deltas"),
+    ("На сколько просмотров суммарно выросли все видео креатора с id cd87be38b50b4fdd8342bb3c383f3c7d в промежутке с 10:00 до 15:00 28 ноября 2025 года?", "creator_hourly_growth"),
+    ("На сколько выросли лайки у видео креатора с id cd87be38b50b4fdd8342bb3c383f3c7d с 9:00 до 12:00 27 ноября 2025?", "creator_hourly_growth"),
+    ("На сколько просмотров выросли видео креатора с id cd87be38b50b4fdd8342bb3c383f3c7d 28 ноября 2025?", "creator_growth"),
+    ("На сколько просмотров в сумме выросли все видео 28 ноября 2025?", "growth"),
+    ("На сколько просмотров выросли все видео 26 ноября 2025?", "growth"),
+    ("На сколько лайков выросли все видео с 25 по 27 ноября 2025?", "growth"),
+    ("на сколько выросли комментарии 1 декабря 2025", "growth"),
+    ("Сколько разных видео получали новые просмотры 27 ноября 2025?", "distinct_growth"),
+    ("Сколько различных видео получали новые просмотры 28 ноября 2025?", "distinct_growth"),
+    ("Сколько уникальных видео получали новые лайки 26 ноября 2025?", "distinct_growth"),
+    ("Какое суммарное количество просмотров набрали все видео, опубликованные в июне 2025 года?", "published_sum"),
+    ("Суммарное число лайков у видео, опубликованных в мае 2025?", "published_sum"),
+    ("Сколько разных креаторов имеют хотя бы одно видео с >100000 просмотров?", "distinct_creators_threshold"),
+    ("Сколько уникальных креаторов имеют видео с больше 50 000 просмотров?", "distinct_creators_threshold"),
+    ("В скольких разных календарных днях ноября 2025 года креатор с id aca1061a9d324ecf8c3fa2bb32d7be63 публиковал хотя бы одно видео?", "creator_active_days"),
+    ("Сколько видео вышло с 1 по 5 мая 2025?", "published_window"),
+    ("Сколько видео было опубликовано в ноябре 2025?", "published_window"),
+    ("Сколько всего замеров статистики?", "total_snapshots"),
+    ("Сколько в среднем комментариев на видео?", None),
+    ("Какое максимальное количество лайков у видео?", None),
+    ("Сколько видео имеют больше лайков чем просмотров?", None),
+    ("Какой день ноября был самым активным для просмотров?", None),
+    # Compound questions: templates hold one value per slot.
+    ("Сколько видео набрали больше 1000 лайков и меньше 10 комментариев?", None),
+    ("Сколько видео набрали больше 10 000 просмотров, но меньше 5 лайков?", None),
+    ("Сколько видео набрали больше 1000 и меньше 5000 просмотров?", None),
+    ("Сколько видео у креатора с id abc и креатора с id def?", None),
+    ("На сколько просмотров выросли все видео 28 ноября 2025 и 30 ноября 2025?", None),
+    ("Сколько видео опубликовано в октябре 2025 и ноябре 2025?", None),
+    # Near misses: a missing or different slot than the template's.
+    ("Сколько креаторов опубликовали больше 10 видео?", None),
+    ("Сколько видео у креатора с id abc набрали больше 10?", None),
+    ("Сколько разных креаторов опубликовали видео в октябре 2025?", None),
+    ("На сколько просмотров выросли все видео 31 февраля 2025?", None),
+    ("На сколько уменьшилось число лайков суммарно за 26 ноября 2025?", None),
+    ("На сколько упали просмотры у всех видео 28 ноября 2025?", None),
+    ("Сколько видео опубликовали креаторы с id aca1061a9d324ecf8c3fa2bb32d7be63 и с id cd87be38b50b4fdd8342bb3c383f3c7d в ноябре 2025?", None),
+    ("Сколько разных креаторов получили новые просмотры 27 ноября 2025?", None),
+    ("На сколько лайков выросли все видео 28 ноября 2025, не считая отрицательных замеров?", None),
+    # Modifiers no template expresses: negation, exclusion, open and relative
+    # periods, bare years and months, rates.
+    ("Сколько видео не получило лайков?", None),
+    ("Сколько видео не набрало больше 1000 просмотров?", None),
+    ("Сколько видео без лайков?", None),
+    ("Сколько видео, кроме креатора с id abc?", None),
+    ("Сколько видео за исключением креатора с id abc набрали больше 100 лайков?", None),
+    ("Сколько видео опубликовано после 1 ноября 2025?", None),
+    ("Сколько видео опубликовано до 1 ноября 2025?", None),
+    ("Сколько видео опубликовано с 1 ноября 2025?", None),
+    ("Сколько всего видео опубликовано в 2025 году?", None),
+    ("Сколько видео у креатора с id aca1061a9d324ecf8c3fa2bb32d7be63 в 2025 году?", None),
+    ("Сколько всего видео вышло вчера?", None),
+    ("Сколько всего видео опубликовано за последнюю неделю?", None),
+    ("Сколько видео у креатора с id aca1061a9d324ecf8c3fa2bb32d7be63 за последние 7 дней?", None),
+    ("Сколько видео было опубликовано в ноябре?", None),
+    ("Сколько видео набрали больше 100 просмотров в час?", None),
+    ("На сколько просмотров выросли все видео 28 ноября 2025 с 10:00 до 15:00?", None),
+    # Creator ids are case-sensitive.
+    ("Сколько видео у креатора с ID AbC123?", "creator_videos"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=1000)
+    args = parser.parse_args()
+
+    hits, wrong = Counter(), []
+    for question, expected in CORPUS:
+        match = match_template(question)
+        name = match.name if match else None
+        if name:
+            hits[name] += 1
+        if name != expected:
+            wrong.append((question, expected, name))
+    shadowed = []
+    for example in EXAMPLES:
+        match = match_template(example.question)
+        if match is not None:
+            shadowed.append((example.question, match.name))
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        for question, _ in CORPUS:
+            match_template(question)
+    elapsed = time.perf_counter() - started
+
+    total = len(CORPUS)
+    answerable = sum(1 for _, expected in CORPUS if expected)
+    print(f"corpus:      {total} questions ({answerable} answerable by templates)")
+    print(f"hit rate:    {sum(hits.values()) / total:.1%} of all, "
+          f"{sum(hits.values()) / answerable:.1%} of answerable")
+    print(f"throughput:  {args.rounds * total / elapsed:,.0f} questions/s")
+    print(f"per match:   {elapsed / (args.rounds * total) * 1e6:.1f} us")
+    for question, expected, name in wrong:
+        print(f"MISMATCH expected={expected} got={name}: {question}")
+    for question, name in shadowed:
+        print(f"EXAMPLE ANSWERED BY {name}: {question}")
+    return 1 if wrong or shadowed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
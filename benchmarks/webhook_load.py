@@ -0,0 +1,268 @@
+"""Post fake Telegram updates to the webhook server and measure throughput per worker count.
+
+Starts a fake Bot API server (TELEGRAM_API_URL) that records every
+sendMessage, then for each worker count launches the bot with
+BOT_MODE=webhook, waits until /readyz has reported ready from every
+worker, posts --updates template questions from --senders processes and
+waits for the replies. Each update comes from its own chat, so per-chat
+fairness never throttles the run.
+
+By default the bot answers from the database in DATABASE_URL (or
+--database-url). --stub-db-ms replaces the database with a blocking sleep
+of that many ms, so the run only measures the webhook, dispatch and
+template path:
+
+    python benchmarks/webhook_load.py --workers 1,2,4 --updates 4000 --stub-db-ms 2
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+TOKEN = "123456:TEST-webhook-load-token"
+QUESTIONS = (
+    "Сколько всего видео есть в системе?",
+    "Сколько видео набрало больше {n} просмотров?",
+    "Сколько видео у креатора с id {creator} набрали больше {n} лайков?",
+    "На сколько просмотров в сумме выросли все видео {day} ноября 2025?",
+    "Сколько разных видео получали новые просмотры {day} ноября 2025?",
+)
+
+
+def install_stubs(db_ms: float):
+    """Replace the database with a sleep (run in the bot's worker processes)."""
+    import nl_to_sql
+
+    def fake_execute(sql, params=None):
+        time.sleep(db_ms / 1000)
+        return len(sql) + len(params or ())
+
+    nl_to_sql.execute_sql_and_get_number = fake_execute
+    nl_to_sql.warm_up = lambda: None
+
+
+# Spawned webhook workers import this module as their __main__.
+if os.getenv("WEBHOOK_LOAD_STUB_DB_MS"):
+    install_stubs(float(os.environ["WEBHOOK_LOAD_STUB_DB_MS"]))
+
+
+def question(i: int, distinct: int) -> str:
+    i %= distinct
+    return QUESTIONS[i % len(QUESTIONS)].format(n=1000 + i, creator=f"{i:032x}", day=1 + i % 28)
+
+
+def update(i: int, distinct: int) -> dict:
+    chat = {"id": 1_000_000 + i, "type": "private"}
+    return {
+        "update_id": i,
+        "message": {
+            "message_id": i,
+            "date": int(time.time()),
+            "chat": chat,
+            "from": {"id": chat["id"], "is_bot": False, "first_name": "Load"},
+            "text": question(i, distinct),
+        },
+    }
+
+
+def run_fake_api(port: int):
+    """Bot API stand-in: answers sendMessage and remembers when each chat got its reply."""
+    from aiohttp import web
+
+    replies = {}
+
+    async def method(request):
+        form = await request.post()
+        if request.match_info["method"].lower() == "sendmessage":
+            chat_id = int(form["chat_id"])
+            replies[chat_id] = (time.time(), form["text"])
+            result = {"message_id": len(replies), "date": int(time.time()),
+                      "chat": {"id": chat_id, "type": "private"}, "text": form["text"]}
+            return web.json_response({"ok": True, "result": result})
+        return web.json_response({"ok": True, "result": True})
+
+    async def stats(request):
+        return web.json_response({str(chat_id): reply for chat_id, reply in replies.items()})
+
+    async def reset(request):
+        replies.clear()
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", method)
+    app.router.add_get("/stats", stats)
+    app.router.add_post("/reset", reset)
+    web.run_app(app, host="127.0.0.1", port=port, access_log=None, print=None)
+
+
+def send_updates(url: str, first: int, count: int, distinct: int, concurrency: int):
+    """One sender process: POST updates [first, first + count); returns send times, statuses, end time."""
+    from aiohttp import ClientSession, TCPConnector
+
+    async def run():
+        sent, statuses = {}, Counter()
+        next_update = iter(range(first, first + count))
+
+        async def sender(session):
+            for i in next_update:
+                sent[1_000_000 + i] = time.time()
+                try:
+                    async with session.post(url, json=update(i, distinct)) as response:
+                        statuses[response.status] += 1
+                except OSError:
+                    statuses["error"] += 1
+
+        async with ClientSession(connector=TCPConnector(limit=concurrency)) as session:
+            await asyncio.gather(*(sender(session) for _ in range(concurrency)))
+        return sent, statuses, time.time()
+
+    return asyncio.run(run())
+
+
+async def wait_ready(base: str, workers: int, timeout: float):
+    from aiohttp import ClientError, ClientSession
+
+    ready = set()
+    deadline = time.monotonic() + timeout
+    async with ClientSession() as session:
+        while len(ready) < workers:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"only {len(ready)}/{workers} workers ready after {timeout:.0f}s "
+                                   f"(is the database reachable?)")
+            try:
+                # A fresh connection each time, so SO_REUSEPORT picks a worker again.
+                async with session.get(f"{base}/readyz", headers={"Connection": "close"}) as response:
+                    body = await response.json()
+                    if response.status == 200:
+                        ready.add(body["worker"])
+            except (ClientError, OSError):
+                pass
+            await asyncio.sleep(0.05)
+
+
+async def api_call(url: str, method: str = "GET"):
+    from aiohttp import ClientSession
+
+    async with ClientSession() as session:
+        async with session.request(method, url) as response:
+            return await response.json()
+
+
+def measure(args, workers: int, api_url: str) -> dict:
+    env = dict(os.environ, BOT_MODE="webhook", WEB_WORKERS=str(workers), WEBHOOK_HOST="127.0.0.1",
+               WEBHOOK_PORT=str(args.port), WEBHOOK_URL="", TELEGRAM_API_URL=api_url,
+               TELEGRAM_BOT_TOKEN=TOKEN, METRICS_PORT="0", LLM_BACKEND="fake",
+               BOT_MAX_QUEUE=str(args.max_queue or args.updates))
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+    if args.stub_db_ms is not None:
+        env["WEBHOOK_LOAD_STUB_DB_MS"] = str(args.stub_db_ms)
+        command = [sys.executable, os.path.abspath(__file__), "--serve"]
+    else:
+        command = [sys.executable, os.path.join(SRC, "bot.py")]
+
+    asyncio.run(api_call(f"{api_url}/reset", "POST"))
+    base = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(command, env=env)
+    try:
+        started = time.monotonic()
+        asyncio.run(wait_ready(base, workers, args.ready_timeout))
+        ready_s = time.monotonic() - started
+
+        per_sender = -(-args.updates // args.senders)
+        jobs = [(f"{base}/webhook", i * per_sender, min(per_sender, args.updates - i * per_sender),
+                 args.distinct, args.concurrency) for i in range(args.senders)]
+        with multiprocessing.get_context("spawn").Pool(args.senders) as pool:
+            results = pool.starmap(send_updates, jobs)
+
+        sent, statuses = {}, Counter()
+        for sender_sent, sender_statuses, _ in results:
+            sent.update(sender_sent)
+            statuses.update(sender_statuses)
+        started = min(sent.values())
+        posted_s = max(finished for _, _, finished in results) - started
+        deadline = time.monotonic() + args.reply_timeout
+        while True:
+            replies = asyncio.run(api_call(f"{api_url}/stats"))
+            if len(replies) >= statuses[200] or time.monotonic() > deadline:
+                break
+            time.sleep(0.2)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    latencies = [(reply_at - sent[int(chat_id)]) * 1000 for chat_id, (reply_at, _) in replies.items()]
+    last_reply = max((reply_at for reply_at, _ in replies.values()), default=started)
+    return {
+        "workers": workers,
+        "ready_s": ready_s,
+        "accepted": statuses[200],
+        "rejected": sum(count for status, count in statuses.items() if status != 200),
+        "post_rate": statuses[200] / posted_s,
+        "replies": len(replies),
+        "busy": sum(1 for _, text in replies.values() if not text.lstrip("-").isdigit()),
+        "reply_rate": len(replies) / (last_reply - started) if replies else 0.0,
+        "p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "p95_ms": statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--updates", type=int, default=4000)
+    parser.add_argument("--distinct", type=int, default=500, help="distinct questions (cache keys)")
+    parser.add_argument("--senders", type=int, default=2, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=64, help="requests in flight per sender")
+    parser.add_argument("--max-queue", type=int,
+                        help="bot's BOT_MAX_QUEUE (default: --updates, so nothing is answered as busy)")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--api-port", type=int, default=8089)
+    parser.add_argument("--database-url")
+    parser.add_argument("--stub-db-ms", type=float, help="replace the database with a sleep of this many ms")
+    parser.add_argument("--ready-timeout", type=float, default=60)
+    parser.add_argument("--reply-timeout", type=float, default=60)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        import bot
+
+        bot.serve_webhook()
+        return
+
+    api_url = f"http://127.0.0.1:{args.api_port}"
+    api = multiprocessing.get_context("spawn").Process(target=run_fake_api, args=(args.api_port,), daemon=True)
+    api.start()
+    try:
+        asyncio.run(asyncio.sleep(1))
+        print(f"{args.updates} updates, {args.distinct} distinct questions, {args.senders} senders x "
+              f"{args.concurrency} in flight, {os.cpu_count()} CPUs, "
+              f"{'stub DB %.0f ms' % args.stub_db_ms if args.stub_db_ms is not None else 'database'}\n")
+        print(f"{'workers':>8}{'ready s':>9}{'posts/s':>10}{'replies/s':>11}{'p50 ms':>9}{'p95 ms':>9}"
+              f"{'busy':>6}{'lost':>6}")
+        results = []
+        for workers in map(int, args.workers.split(",")):
+            result = measure(args, workers, api_url)
+            results.append(result)
+            print(f"{workers:>8}{result['ready_s']:>9.1f}{result['post_rate']:>10.0f}{result['reply_rate']:>11.0f}"
+                  f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['busy']:>6}"
+                  f"{result['accepted'] - result['replies'] + result['rejected']:>6}")
+        if len(results) > 1 and results[0]["reply_rate"]:
+            print("\nscaling: " + ", ".join(
+                f"{r['workers']}w {r['reply_rate'] / results[0]['reply_rate']:.2f}x" for r in results))
+    finally:
+        api.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,10 @@ while ! pg_isready -h postgres -U postgres; do
     sleep 1
 done
 
-echo "Running database migrations..."
-PGPASSWORD=postgres123 psql -h postgres -U postgres -d video_stats -f /app/migrations/01_create_tables.sql
-
-echo "Loading data from JSON..."
-python src/load_data.py
+# load_data applies every migrations/*.sql (all idempotent) before loading;
+# docker-entrypoint-initdb.d only runs them on an empty volume.
+echo "Applying migrations and loading data from JSON..."
+python src/load_data.py --incremental
 
 echo "Starting Telegram bot..."
 exec python src/bot.py
\ No newline at end of file
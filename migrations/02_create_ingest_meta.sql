@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS ingest_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO ingest_meta (key, value) VALUES ('data_version', '0')
+ON CONFLICT (key) DO NOTHING;
@@ -0,0 +1,104 @@
+-- Pre-aggregated snapshot deltas, kept current by load_data via refresh_rollups().
+-- Buckets are UTC days/hours, matching the '+00' bounds the bot generates.
+
+CREATE TABLE IF NOT EXISTS rollup_video_daily (
+    day DATE NOT NULL,
+    video_id TEXT NOT NULL,
+    creator_id TEXT NOT NULL,
+    delta_views_count BIGINT NOT NULL DEFAULT 0,
+    delta_likes_count BIGINT NOT NULL DEFAULT 0,
+    delta_comments_count BIGINT NOT NULL DEFAULT 0,
+    delta_reports_count BIGINT NOT NULL DEFAULT 0,
+    positive_views_snapshots INTEGER NOT NULL DEFAULT 0,
+    positive_likes_snapshots INTEGER NOT NULL DEFAULT 0,
+    positive_comments_snapshots INTEGER NOT NULL DEFAULT 0,
+    positive_reports_snapshots INTEGER NOT NULL DEFAULT 0,
+    negative_views_snapshots INTEGER NOT NULL DEFAULT 0,
+    negative_likes_snapshots INTEGER NOT NULL DEFAULT 0,
+    negative_comments_snapshots INTEGER NOT NULL DEFAULT 0,
+    negative_reports_snapshots INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, video_id)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_creator_daily (
+    day DATE NOT NULL,
+    creator_id TEXT NOT NULL,
+    delta_views_count BIGINT NOT NULL DEFAULT 0,
+    delta_likes_count BIGINT NOT NULL DEFAULT 0,
+    delta_comments_count BIGINT NOT NULL DEFAULT 0,
+    delta_reports_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, creator_id)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_creator_hourly (
+    hour TIMESTAMPTZ NOT NULL,
+    creator_id TEXT NOT NULL,
+    delta_views_count BIGINT NOT NULL DEFAULT 0,
+    delta_likes_count BIGINT NOT NULL DEFAULT 0,
+    delta_comments_count BIGINT NOT NULL DEFAULT 0,
+    delta_reports_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (hour, creator_id)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_creator_totals (
+    creator_id TEXT PRIMARY KEY,
+    video_count BIGINT NOT NULL DEFAULT 0,
+    views_count BIGINT NOT NULL DEFAULT 0,
+    likes_count BIGINT NOT NULL DEFAULT 0,
+    comments_count BIGINT NOT NULL DEFAULT 0,
+    reports_count BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_creator_daily_creator ON rollup_creator_daily(creator_id, day);
+CREATE INDEX IF NOT EXISTS idx_rollup_creator_hourly_creator ON rollup_creator_hourly(creator_id, hour);
+
+
+-- Rebuild every bucket from since's UTC day onwards (all buckets when since is NULL).
+CREATE OR REPLACE FUNCTION refresh_rollups(since TIMESTAMPTZ DEFAULT NULL) RETURNS VOID AS $$
+DECLARE
+    from_day DATE := COALESCE((since AT TIME ZONE 'UTC')::date, '-infinity'::date);
+    from_ts TIMESTAMPTZ := COALESCE(from_day::timestamp AT TIME ZONE 'UTC', '-infinity'::timestamptz);
+BEGIN
+    DELETE FROM rollup_video_daily WHERE day >= from_day;
+    INSERT INTO rollup_video_daily
+    SELECT (s.created_at AT TIME ZONE 'UTC')::date, s.video_id, v.creator_id,
+           SUM(s.delta_views_count), SUM(s.delta_likes_count),
+           SUM(s.delta_comments_count), SUM(s.delta_reports_count),
+           COUNT(*) FILTER (WHERE s.delta_views_count > 0),
+           COUNT(*) FILTER (WHERE s.delta_likes_count > 0),
+           COUNT(*) FILTER (WHERE s.delta_comments_count > 0),
+           COUNT(*) FILTER (WHERE s.delta_reports_count > 0),
+           COUNT(*) FILTER (WHERE s.delta_views_count < 0),
+           COUNT(*) FILTER (WHERE s.delta_likes_count < 0),
+           COUNT(*) FILTER (WHERE s.delta_comments_count < 0),
+           COUNT(*) FILTER (WHERE s.delta_reports_count < 0)
+    FROM video_snapshots s JOIN videos v ON v.id = s.video_id
+    WHERE s.created_at >= from_ts
+    GROUP BY 1, 2, 3;
+
+    DELETE FROM rollup_creator_daily WHERE day >= from_day;
+    INSERT INTO rollup_creator_daily
+    SELECT day, creator_id,
+           SUM(delta_views_count), SUM(delta_likes_count),
+           SUM(delta_comments_count), SUM(delta_reports_count)
+    FROM rollup_video_daily
+    WHERE day >= from_day
+    GROUP BY 1, 2;
+
+    DELETE FROM rollup_creator_hourly WHERE hour >= from_ts;
+    INSERT INTO rollup_creator_hourly
+    SELECT date_trunc('hour', s.created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC', v.creator_id,
+           SUM(s.delta_views_count), SUM(s.delta_likes_count),
+           SUM(s.delta_comments_count), SUM(s.delta_reports_count)
+    FROM video_snapshots s JOIN videos v ON v.id = s.video_id
+    WHERE s.created_at >= from_ts
+    GROUP BY 1, 2;
+
+    DELETE FROM rollup_creator_totals;
+    INSERT INTO rollup_creator_totals
+    SELECT creator_id, COUNT(*), SUM(views_count), SUM(likes_count),
+           SUM(comments_count), SUM(reports_count)
+    FROM videos
+    GROUP BY creator_id;
+END;
+$$ LANGUAGE plpgsql;
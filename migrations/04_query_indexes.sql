@@ -0,0 +1,25 @@
+-- Indexes shaped after the queries the bot generates (see src/templates.py).
+
+-- Per-creator windows and thresholds on final statistics.
+CREATE INDEX IF NOT EXISTS idx_videos_creator_created_at ON videos (creator_id, video_created_at);
+CREATE INDEX IF NOT EXISTS idx_videos_creator_views ON videos (creator_id, views_count);
+CREATE INDEX IF NOT EXISTS idx_videos_views_count ON videos (views_count) INCLUDE (creator_id);
+CREATE INDEX IF NOT EXISTS idx_videos_created_at_totals ON videos (video_created_at)
+    INCLUDE (views_count, likes_count, comments_count, reports_count);
+CREATE INDEX IF NOT EXISTS idx_videos_with_likes ON videos (likes_count) WHERE likes_count > 0;
+
+-- Snapshot windows: covering for SUM(delta_*) and COUNT(DISTINCT video_id).
+CREATE INDEX IF NOT EXISTS idx_snapshots_created_video ON video_snapshots (created_at, video_id)
+    INCLUDE (delta_views_count, delta_likes_count, delta_comments_count, delta_reports_count);
+-- Per-creator windows join videos by creator, then probe snapshots per video.
+CREATE INDEX IF NOT EXISTS idx_snapshots_video_created ON video_snapshots (video_id, created_at)
+    INCLUDE (delta_views_count, delta_likes_count);
+CREATE INDEX IF NOT EXISTS idx_snapshots_positive_views ON video_snapshots (created_at, video_id)
+    WHERE delta_views_count > 0;
+CREATE INDEX IF NOT EXISTS idx_snapshots_negative_views ON video_snapshots (created_at)
+    WHERE delta_views_count < 0;
+
+-- Superseded by the composite indexes above.
+DROP INDEX IF EXISTS idx_videos_creator_id;
+DROP INDEX IF EXISTS idx_snapshots_video_id;
+DROP INDEX IF EXISTS idx_snapshots_created_at;
@@ -0,0 +1,94 @@
+-- Range-partition video_snapshots on created_at so date-window questions
+-- only touch the partitions their literal bounds select.
+
+-- Create the month (or day) partitions covering [from_ts, to_ts]. Rows that
+-- already landed in the default partition for a new range are moved into it.
+CREATE OR REPLACE FUNCTION ensure_snapshot_partitions(
+    from_ts TIMESTAMPTZ, to_ts TIMESTAMPTZ, granularity TEXT DEFAULT 'month'
+) RETURNS INTEGER AS $$
+DECLARE
+    step INTERVAL := CASE granularity WHEN 'day' THEN INTERVAL '1 day' ELSE INTERVAL '1 month' END;
+    name_format TEXT := CASE granularity WHEN 'day' THEN '"video_snapshots_p"YYYY"_"MM"_"DD' ELSE '"video_snapshots_p"YYYY"_"MM' END;
+    bucket TIMESTAMP := date_trunc(CASE granularity WHEN 'day' THEN 'day' ELSE 'month' END, from_ts AT TIME ZONE 'UTC');
+    last_bucket TIMESTAMP := to_ts AT TIME ZONE 'UTC';
+    range_start TIMESTAMPTZ;
+    range_end TIMESTAMPTZ;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE bucket <= last_bucket LOOP
+        partition_name := to_char(bucket, name_format);
+        range_start := bucket AT TIME ZONE 'UTC';
+        range_end := (bucket + step) AT TIME ZONE 'UTC';
+
+        IF to_regclass(partition_name) IS NULL THEN
+            IF EXISTS (SELECT 1 FROM video_snapshots_default
+                       WHERE created_at >= range_start AND created_at < range_end) THEN
+                EXECUTE format('CREATE TABLE %I (LIKE video_snapshots INCLUDING DEFAULTS)', partition_name);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM video_snapshots_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM moved', range_start, range_end, partition_name);
+                EXECUTE format('ALTER TABLE video_snapshots ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                               partition_name, range_start, range_end);
+            ELSE
+                EXECUTE format('CREATE TABLE %I PARTITION OF video_snapshots FOR VALUES FROM (%L) TO (%L)',
+                               partition_name, range_start, range_end);
+            END IF;
+            created := created + 1;
+        END IF;
+
+        bucket := bucket + step;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+
+DO $$
+DECLARE
+    oldest TIMESTAMPTZ;
+    newest TIMESTAMPTZ;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'video_snapshots'::regclass) THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE video_snapshots RENAME TO video_snapshots_unpartitioned;
+    ALTER TABLE video_snapshots_unpartitioned RENAME CONSTRAINT video_snapshots_pkey TO video_snapshots_unpartitioned_pkey;
+
+    -- The partition key has to be part of the primary key.
+    CREATE TABLE video_snapshots (
+        id TEXT NOT NULL,
+        video_id TEXT NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+        views_count INTEGER NOT NULL DEFAULT 0,
+        likes_count INTEGER NOT NULL DEFAULT 0,
+        comments_count INTEGER NOT NULL DEFAULT 0,
+        reports_count INTEGER NOT NULL DEFAULT 0,
+        delta_views_count INTEGER NOT NULL DEFAULT 0,
+        delta_likes_count INTEGER NOT NULL DEFAULT 0,
+        delta_comments_count INTEGER NOT NULL DEFAULT 0,
+        delta_reports_count INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMPTZ NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+
+    CREATE TABLE video_snapshots_default PARTITION OF video_snapshots DEFAULT;
+
+    SELECT MIN(created_at), MAX(created_at) INTO oldest, newest FROM video_snapshots_unpartitioned;
+    PERFORM ensure_snapshot_partitions(COALESCE(oldest, NOW()), GREATEST(COALESCE(newest, NOW()), NOW()) + INTERVAL '3 months');
+
+    INSERT INTO video_snapshots SELECT * FROM video_snapshots_unpartitioned;
+    DROP TABLE video_snapshots_unpartitioned;
+END $$;
+
+
+-- Indexes from 04_query_indexes.sql, now created on every partition.
+CREATE INDEX IF NOT EXISTS idx_snapshots_created_video ON video_snapshots (created_at, video_id)
+    INCLUDE (delta_views_count, delta_likes_count, delta_comments_count, delta_reports_count);
+CREATE INDEX IF NOT EXISTS idx_snapshots_video_created ON video_snapshots (video_id, created_at)
+    INCLUDE (delta_views_count, delta_likes_count);
+CREATE INDEX IF NOT EXISTS idx_snapshots_positive_views ON video_snapshots (created_at, video_id)
+    WHERE delta_views_count > 0;
+CREATE INDEX IF NOT EXISTS idx_snapshots_negative_views ON video_snapshots (created_at)
+    WHERE delta_views_count < 0;
@@ -0,0 +1,3 @@
+-- Fill the rollups once for snapshots loaded before 03 created them; from here
+-- on load_data refreshes only the buckets its new snapshots touch.
+SELECT refresh_rollups(NULL);
@@ -1,9 +1,20 @@
 import os
 import asyncio
+import multiprocessing
+import multiprocessing.connection
+import signal
+import socket
+import time
 from dotenv import load_dotenv
+from aiohttp import web
 from aiogram import Bot, Dispatcher, types
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import CommandStart
-from nl_to_sql import ask_question
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from metrics import FALLBACKS, Gauge, stage, start_metrics_server
+from nl_to_sql import ask_question_async, cache_backend, gateway, warm_up_async
+from scheduler import scheduler_from_env
 
 
 load_dotenv()
@@ -13,8 +24,29 @@ TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 if not TOKEN:
     raise ValueError("Add TELEGRAM_BOT_TOKEN to .env!")
 
+# polling: one process asks Telegram for updates. webhook: Telegram posts
+# updates to WEBHOOK_PATH, served by WEB_WORKERS processes on one port.
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+# Another Bot API server, e.g. a local fake one for load tests.
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+# Public base URL to register with Telegram; empty leaves the registration as it is.
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "10"))
 
-bot = Bot(token=TOKEN)
+
+def create_bot() -> Bot:
+    if TELEGRAM_API_URL:
+        return Bot(token=TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)))
+    return Bot(token=TOKEN)
+
+
+bot = create_bot()
 dp = Dispatcher()
 
 
@@ -47,21 +79,178 @@ async def cmd_start(message: types.Message):
     )
 
 
-@dp.message()
-async def handle_question(message: types.Message):
+BUSY_REPLY = "Слишком много вопросов, попробуйте через минуту."
+
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+
+async def answer_question(message: types.Message):
     question = message.text.strip()
     try:
-        answer = ask_question(question)
-        await message.answer(str(answer))
+        with stage("question"):
+            answer = await ask_question_async(question)
+        with stage("reply"):
+            await message.answer(str(answer))
     except Exception as e:
         print(f"Error in bot: {e}")
+        FALLBACKS.inc(reason="exception")
         await message.answer("0")
 
 
+scheduler = scheduler_from_env(answer_question)
+Gauge("bot_scheduler_pending", "Questions waiting for a worker", lambda: scheduler.pending)
+metrics_runner = None
+warmup_task = None
+# Per process: which webhook worker this is, and whether warm-up has finished.
+worker = {"index": 0, "ready": False}
+Gauge("bot_ready", "1 once the database and templates are warm", lambda: int(worker["ready"]))
+
+
+@dp.message()
+async def handle_question(message: types.Message):
+    if not message.text:
+        return
+    if not scheduler.submit(message.chat.id, message):
+        await message.answer(BUSY_REPLY)
+
+
+async def warm_up_until_ready():
+    while not await warm_up_async():
+        await asyncio.sleep(WARMUP_RETRY_SECONDS)
+    worker["ready"] = True
+    print(f"Worker {worker['index']} is ready")
+
+
+@dp.startup()
+async def on_startup():
+    global metrics_runner, warmup_task
+    await scheduler.start()
+    if METRICS_PORT and metrics_runner is None:
+        # Every webhook worker serves its own /metrics on the next port.
+        metrics_runner = await start_metrics_server(METRICS_PORT + worker["index"])
+    if BOT_MODE == "webhook":
+        # Start listening (and answering /healthz) now; updates wait for readiness.
+        warmup_task = asyncio.create_task(warm_up_until_ready())
+    else:
+        worker["ready"] = await warm_up_async()
+
+
+@dp.shutdown()
+async def on_shutdown():
+    global metrics_runner
+    worker["ready"] = False
+    if warmup_task is not None:
+        warmup_task.cancel()
+    await scheduler.drain(SHUTDOWN_DRAIN_SECONDS)
+    await scheduler.stop()
+    await gateway.close()
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+        metrics_runner = None
+
+
+async def healthz(request):
+    return web.json_response({"status": "ok", "worker": worker["index"]})
+
+
+async def readyz(request):
+    if not worker["ready"]:
+        return web.json_response({"status": "warming up", "worker": worker["index"]}, status=503)
+    return web.json_response({"status": "ready", "worker": worker["index"], "pending": scheduler.pending})
+
+
+@web.middleware
+async def readiness_gate(request, handler):
+    # Telegram redelivers updates that get a non-2xx reply, so nothing is
+    # answered with 0 just because the database is not up yet.
+    if request.path == WEBHOOK_PATH and not worker["ready"]:
+        return web.json_response({"status": "warming up"}, status=503)
+    return await handler(request)
+
+
+def create_webhook_app() -> web.Application:
+    app = web.Application(middlewares=[readiness_gate])
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/readyz", readyz)
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET or None).register(
+        app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+def run_webhook_worker(index: int = 0, reuse_port: bool = False):
+    """Serve the webhook app in this process until SIGTERM/SIGINT, then shut down gracefully."""
+    worker["index"] = index
+    web.run_app(create_webhook_app(), host=WEBHOOK_HOST, port=WEBHOOK_PORT, reuse_port=reuse_port or None,
+                shutdown_timeout=SHUTDOWN_DRAIN_SECONDS, access_log=None, print=None)
+
+
+async def register_webhook():
+    await bot.set_webhook(WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH, secret_token=WEBHOOK_SECRET or None,
+                          allowed_updates=dp.resolve_used_update_types())
+    await bot.session.close()
+
+
+def serve_webhook(workers: int = WEB_WORKERS):
+    """Run ``workers`` webhook processes on one port and restart any that die.
+
+    Each worker binds WEBHOOK_PORT with SO_REUSEPORT, so the kernel spreads
+    connections across them. Workers share nothing in memory: they each have
+    their own scheduler, DB pool and LLM gateway, and share cached SQL and
+    results only through CACHE_BACKEND (sqlite or redis).
+    """
+    if WEBHOOK_URL:
+        asyncio.run(register_webhook())
+    print(f"Webhook on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}, {workers} worker(s)")
+    if workers <= 1:
+        run_webhook_worker()
+        return
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise ValueError("WEB_WORKERS > 1 needs SO_REUSEPORT support")
+    if cache_backend is None:
+        print("CACHE_BACKEND=memory: every worker keeps its own caches")
+
+    # spawn, not fork: each worker builds its own pools, threads and event loop.
+    context = multiprocessing.get_context("spawn")
+    processes = {}
+    stopping = []
+
+    def start(index):
+        process = context.Process(target=run_webhook_worker, args=(index, True), name=f"webhook-{index}")
+        process.start()
+        return process
+
+    def stop(signum, frame):
+        stopping.append(signum)
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(workers):
+        processes[index] = start(index)
+
+    while processes:
+        multiprocessing.connection.wait([process.sentinel for process in processes.values()], timeout=1)
+        for index, process in list(processes.items()):
+            if process.exitcode is None:
+                continue
+            del processes[index]
+            if not stopping:
+                print(f"Worker {index} exited with code {process.exitcode}, restarting")
+                time.sleep(1)
+                processes[index] = start(index)
+
+
 async def main():
     print("Bot is running and waiting for messages...")
     await dp.start_polling(bot)
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    if BOT_MODE == "webhook":
+        serve_webhook()
+    else:
+        asyncio.run(main())
\ No newline at end of file
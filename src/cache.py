@@ -0,0 +1,236 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+log = logging.getLogger(__name__)
+
+
+class CacheBackendError(Exception):
+    pass
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries expire after ``ttl`` seconds.
+
+    An optional persistent ``backend`` (SQLite or Redis-compatible) sits behind
+    the LRU so a restarted process does not start cold. When the backend
+    fails the cache keeps working in-process only and tries the backend
+    again after ``backend_retry`` seconds.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300, backend=None,
+                 backend_retry: float = 30):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self.backend_retry = backend_retry
+        self._backend_down_until = None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.backend_errors = 0
+
+    def _backend_key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def _backend_available(self, now: float) -> bool:
+        if self.backend is None:
+            return False
+        down_until = self._backend_down_until
+        return down_until is None or now >= down_until
+
+    def _backend_call(self, method, *args):
+        """Run a backend call; on failure log it, count it and return None."""
+        now = time.monotonic()
+        try:
+            result = method(*args)
+        except CacheBackendError as e:
+            with self._lock:
+                self.backend_errors += 1
+                was_down = self._backend_down_until is not None
+                self._backend_down_until = now + self.backend_retry
+            if not was_down:
+                log.warning("%s cache backend failed, using the in-process cache for %.0fs: %s",
+                            self.name, self.backend_retry, e)
+            return None
+        if self._backend_down_until is not None:
+            self._backend_down_until = None
+            log.info("%s cache backend is back", self.name)
+        return result
+
+    def get(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expirations += 1
+
+        if self._backend_available(now):
+            raw = self._backend_call(self.backend.get, self._backend_key(key))
+            if raw is not None:
+                value = json.loads(raw)
+                self._store(key, value, now)
+                with self._lock:
+                    self.backend_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _store(self, key: str, value, now: float):
+        with self._lock:
+            self._data[key] = (value, now + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def set(self, key: str, value):
+        now = time.monotonic()
+        self._store(key, value, now)
+        if self._backend_available(now):
+            self._backend_call(self.backend.set, self._backend_key(key), json.dumps(value), self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "backend_hits": self.backend_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "backend_errors": self.backend_errors,
+            }
+
+
+class SQLiteBackend:
+    """Key/value store in a local SQLite file, shared by every cache namespace."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            raise CacheBackendError(e) from e
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: float):
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, time.time() + ttl),
+                )
+        except sqlite3.Error as e:
+            raise CacheBackendError(e) from e
+
+
+class RedisBackend:
+    """Adapter for any client with Redis ``get``/``set(ex=)`` semantics.
+
+    ``errors`` are the client's exception types for an unavailable server.
+    """
+
+    def __init__(self, client, errors=(OSError,)):
+        self.client = client
+        self.errors = tuple(errors)
+
+    def get(self, key: str):
+        try:
+            value = self.client.get(key)
+        except self.errors as e:
+            raise CacheBackendError(e) from e
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        return value
+
+    def set(self, key: str, value: str, ttl: float):
+        try:
+            self.client.set(key, value, ex=max(1, int(ttl)))
+        except self.errors as e:
+            raise CacheBackendError(e) from e
+
+
+class FakeRedis:
+    """In-process stand-in for a Redis client (get/set/delete with expiry)."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ex if ex else None)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+
+def backend_from_env():
+    kind = os.getenv("CACHE_BACKEND", "memory").lower()
+    if kind == "memory":
+        return None
+    if kind == "sqlite":
+        default_path = os.path.join(os.path.dirname(__file__), "..", "data", "cache.sqlite")
+        return SQLiteBackend(os.getenv("CACHE_PATH", default_path))
+    if kind == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("CACHE_BACKEND=redis requires the 'redis' package")
+        client = redis.Redis.from_url(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            socket_timeout=float(os.getenv("REDIS_TIMEOUT", "0.5")),
+            socket_connect_timeout=float(os.getenv("REDIS_TIMEOUT", "0.5")),
+        )
+        return RedisBackend(client, errors=(redis.RedisError, OSError))
+    if kind == "fake-redis":
+        return RedisBackend(FakeRedis())
+    raise ValueError(f"Unknown CACHE_BACKEND: {kind}")
@@ -0,0 +1,342 @@
+import json
+import os
+import shutil
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import text
+
+from templates import TEMPLATE_INTENTS
+
+
+COLUMNAR_PATH = os.getenv(
+    "COLUMNAR_PATH", os.path.join(os.path.dirname(__file__), "..", "data", "columnar"))
+FORMAT_VERSION = 1
+
+METRIC_NAMES = ("views", "likes", "comments", "reports")
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+DAY_US = 86_400_000_000
+
+OPERATORS = {">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal}
+
+
+def to_micros(value) -> int:
+    """Microseconds since the epoch for a datetime or an ISO timestamp string (UTC if naive)."""
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+class ColumnarStore:
+    """Read-only NumPy copy of videos and video_snapshots for template questions.
+
+    Videos are sorted by video_created_at and snapshots by created_at, so a
+    time window is two binary searches; prefix sums turn windowed SUMs into
+    two lookups. Creator ids are dictionary-encoded: ``creator_order`` /
+    ``creator_offsets`` list each creator's videos in time order, and the
+    ``creator_snapshot_*`` columns hold snapshots grouped by creator, so
+    per-creator windows are binary searches too. DATE() is taken in UTC,
+    like the server default.
+    """
+
+    def __init__(self, columns: dict, data_version: int = 0):
+        self.columns = columns
+        self.data_version = data_version
+        self.creators = columns["creators"]
+        self._creator_codes = {creator: code for code, creator in enumerate(self.creators.tolist())}
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["columns"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @property
+    def videos(self) -> int:
+        return len(self.video_ts)
+
+    @property
+    def snapshots(self) -> int:
+        return len(self.snapshot_ts)
+
+    @classmethod
+    def from_arrays(cls, creator_ids, video_ts, video_metrics: dict, snapshot_video, snapshot_ts,
+                    snapshot_deltas: dict, data_version: int = 0):
+        """Sort and encode raw per-video and per-snapshot columns.
+
+        ``snapshot_video`` holds each snapshot's index into the video arrays.
+        """
+        video_ts = np.asarray(video_ts, dtype=np.int64)
+        order = np.argsort(video_ts, kind="stable")
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+
+        creators, creator_codes = np.unique(np.asarray(creator_ids, dtype=str), return_inverse=True)
+        video_creator = creator_codes.astype(np.int32)[order]
+        creator_order = np.argsort(video_creator, kind="stable").astype(np.int64)
+        creator_offsets = np.zeros(len(creators) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(video_creator, minlength=len(creators)), out=creator_offsets[1:])
+
+        columns = {
+            "creators": creators,
+            "video_ts": video_ts[order],
+            "video_creator": video_creator,
+            "creator_order": creator_order,
+            "creator_offsets": creator_offsets,
+        }
+        for metric in METRIC_NAMES:
+            values = np.asarray(video_metrics[metric], dtype=np.int64)[order]
+            columns[f"video_{metric}"] = values
+            columns[f"video_cum_{metric}"] = np.concatenate(([0], np.cumsum(values)))
+
+        snapshot_ts = np.asarray(snapshot_ts, dtype=np.int64)
+        snapshot_order = np.argsort(snapshot_ts, kind="stable")
+        snapshot_video = position[np.asarray(snapshot_video, dtype=np.int64)][snapshot_order]
+        snapshot_ts = snapshot_ts[snapshot_order]
+        snapshot_creator = video_creator[snapshot_video]
+        by_creator = np.argsort(snapshot_creator, kind="stable")
+        creator_snapshot_offsets = np.zeros(len(creators) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(snapshot_creator, minlength=len(creators)), out=creator_snapshot_offsets[1:])
+        columns["snapshot_ts"] = snapshot_ts
+        columns["snapshot_video"] = snapshot_video
+        columns["creator_snapshot_ts"] = snapshot_ts[by_creator]
+        columns["creator_snapshot_offsets"] = creator_snapshot_offsets
+        for metric in METRIC_NAMES:
+            values = np.asarray(snapshot_deltas[metric], dtype=np.int64)[snapshot_order]
+            columns[f"snapshot_delta_{metric}"] = values
+            columns[f"snapshot_cum_{metric}"] = np.concatenate(([0], np.cumsum(values)))
+            columns[f"creator_snapshot_cum_{metric}"] = np.concatenate(([0], np.cumsum(values[by_creator])))
+        return cls(columns, data_version)
+
+    @classmethod
+    def from_videos(cls, videos, data_version: int = 0):
+        """Build from video dicts shaped like data/videos.json (see video_stream.iter_videos)."""
+        creator_ids, video_ts = [], []
+        video_metrics = {metric: [] for metric in METRIC_NAMES}
+        snapshot_video, snapshot_ts = [], []
+        snapshot_deltas = {metric: [] for metric in METRIC_NAMES}
+        # Snapshots are taken on a schedule, so their timestamps repeat a lot.
+        micros = {}
+        for index, video in enumerate(videos):
+            creator_ids.append(str(video["creator_id"]))
+            video_ts.append(to_micros(video["video_created_at"]))
+            for metric in METRIC_NAMES:
+                video_metrics[metric].append(video.get(f"{metric}_count", 0))
+            for snap in video.get("snapshots") or ():
+                snapshot_video.append(index)
+                created_at = snap["created_at"]
+                if created_at not in micros:
+                    micros[created_at] = to_micros(created_at)
+                snapshot_ts.append(micros[created_at])
+                for metric in METRIC_NAMES:
+                    snapshot_deltas[metric].append(snap.get(f"delta_{metric}_count", 0))
+        return cls.from_arrays(creator_ids, video_ts, video_metrics, snapshot_video, snapshot_ts,
+                               snapshot_deltas, data_version)
+
+    @classmethod
+    def from_database(cls, engine, chunk_size: int = 20_000):
+        """Read both tables and the data version from one consistent snapshot.
+
+        Rows are fetched ``chunk_size`` at a time into arrays preallocated
+        from COUNT(*) in the same snapshot; creator ids are dictionary-encoded
+        as they arrive, so only video ids are kept as Python objects.
+        """
+        epoch_us = "(EXTRACT(EPOCH FROM {}) * 1000000)::bigint"
+        with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+            version = conn.execute(
+                text("SELECT value FROM ingest_meta WHERE key = 'data_version'")).scalar()
+            videos, snapshots = conn.execute(text(
+                "SELECT (SELECT COUNT(*) FROM videos), (SELECT COUNT(*) FROM video_snapshots)")).one()
+
+            creator_codes = np.empty(videos, dtype=np.int32)
+            video_ts = np.empty(videos, dtype=np.int64)
+            video_metrics = {metric: np.empty(videos, dtype=np.int64) for metric in METRIC_NAMES}
+            codes, index = {}, {}
+            result = conn.execution_options(stream_results=True).execute(text(
+                f"SELECT id, creator_id, {epoch_us.format('video_created_at')}, "
+                + ", ".join(f"{metric}_count" for metric in METRIC_NAMES) + " FROM videos"))
+            for rows in result.partitions(chunk_size):
+                ids, creators, ts, *metrics = zip(*rows)
+                chunk = slice(len(index), len(index) + len(rows))
+                index.update(zip(ids, range(chunk.start, chunk.stop)))
+                creator_codes[chunk] = [codes.setdefault(creator, len(codes)) for creator in creators]
+                video_ts[chunk] = ts
+                for metric, values in zip(METRIC_NAMES, metrics):
+                    video_metrics[metric][chunk] = values
+
+            snapshot_video = np.empty(snapshots, dtype=np.int64)
+            snapshot_ts = np.empty(snapshots, dtype=np.int64)
+            snapshot_deltas = {metric: np.empty(snapshots, dtype=np.int64) for metric in METRIC_NAMES}
+            filled = 0
+            result = conn.execution_options(stream_results=True).execute(text(
+                f"SELECT video_id, {epoch_us.format('created_at')}, "
+                + ", ".join(f"delta_{metric}_count" for metric in METRIC_NAMES) + " FROM video_snapshots"))
+            for rows in result.partitions(chunk_size):
+                ids, ts, *deltas = zip(*rows)
+                chunk = slice(filled, filled + len(rows))
+                snapshot_video[chunk] = np.fromiter(map(index.__getitem__, ids), np.int64, len(ids))
+                snapshot_ts[chunk] = ts
+                for metric, values in zip(METRIC_NAMES, deltas):
+                    snapshot_deltas[metric][chunk] = values
+                filled = chunk.stop
+
+        creator_ids = np.array(list(codes), dtype=str)[creator_codes]
+        return cls.from_arrays(creator_ids, video_ts, video_metrics, snapshot_video, snapshot_ts,
+                               snapshot_deltas, int(version) if version is not None else 0)
+
+    def save(self, path: str = COLUMNAR_PATH) -> str:
+        """Write ``path/v<data_version>/`` as .npy files; returns that directory.
+
+        The directory is written under a temporary name and renamed, so
+        readers never see a partial snapshot. Older versions are removed.
+        """
+        os.makedirs(path, exist_ok=True)
+        target = os.path.join(path, f"v{self.data_version}")
+        staging = f"{target}.{os.getpid()}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name, values in self.columns.items():
+            np.save(os.path.join(staging, f"{name}.npy"), np.asarray(values))
+        with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"format": FORMAT_VERSION, "data_version": self.data_version,
+                       "videos": self.videos, "snapshots": self.snapshots}, f)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Another process published the same version first.
+            shutil.rmtree(staging, ignore_errors=True)
+        for entry in os.listdir(path):
+            if entry.startswith("v") and entry != f"v{self.data_version}" and not entry.endswith(".tmp"):
+                shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+        return target
+
+    @classmethod
+    def load(cls, path: str = COLUMNAR_PATH, data_version: int = None, mmap: bool = True):
+        """Open a saved snapshot (the newest one unless ``data_version`` is given), or None."""
+        if data_version is None:
+            versions = [int(entry[1:]) for entry in os.listdir(path) if entry[1:].isdigit()] \
+                if os.path.isdir(path) else []
+            if not versions:
+                return None
+            data_version = max(versions)
+        directory = os.path.join(path, f"v{data_version}")
+        try:
+            with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        if meta.get("format") != FORMAT_VERSION:
+            return None
+        columns = {
+            entry[:-4]: np.load(os.path.join(directory, entry), mmap_mode="r" if mmap else None)
+            for entry in os.listdir(directory) if entry.endswith(".npy")
+        }
+        return cls(columns, meta["data_version"])
+
+    def answer(self, sql: str, params: dict):
+        """The number Postgres would return for template SQL, or None for any other SQL."""
+        intent = TEMPLATE_INTENTS.get(sql)
+        if intent is None:
+            return None
+        name, metric, cmp = intent
+        return int(ANSWERS[name](self, metric, cmp, params or {}))
+
+    def _creator_videos(self, params: dict):
+        code = self._creator_codes.get(params["creator_id"])
+        if code is None:
+            return self.creator_order[:0]
+        return self.creator_order[self.creator_offsets[code]:self.creator_offsets[code + 1]]
+
+    @staticmethod
+    def _span(ts, params: dict, inclusive_end: bool = False):
+        lo = np.searchsorted(ts, to_micros(params["start"]), side="left")
+        hi = np.searchsorted(ts, to_micros(params["end"]), side="right" if inclusive_end else "left")
+        return lo, max(lo, hi)
+
+    def _creator_snapshot_sum(self, metric, params, inclusive_end):
+        code = self._creator_codes.get(params["creator_id"])
+        if code is None:
+            return 0
+        first, last = self.creator_snapshot_offsets[code], self.creator_snapshot_offsets[code + 1]
+        lo, hi = self._span(self.creator_snapshot_ts[first:last], params, inclusive_end)
+        cumulative = self.columns[f"creator_snapshot_cum_{metric}"]
+        return cumulative[first + hi] - cumulative[first + lo]
+
+    def negative_deltas(self, metric, cmp, params):
+        return np.count_nonzero(self.columns[f"snapshot_delta_{metric}"] < 0)
+
+    def creator_hourly_growth(self, metric, cmp, params):
+        return self._creator_snapshot_sum(metric, params, inclusive_end=True)
+
+    def creator_growth(self, metric, cmp, params):
+        return self._creator_snapshot_sum(metric, params, inclusive_end=False)
+
+    def growth(self, metric, cmp, params):
+        lo, hi = self._span(self.snapshot_ts, params)
+        cumulative = self.columns[f"snapshot_cum_{metric}"]
+        return cumulative[hi] - cumulative[lo]
+
+    def distinct_growth(self, metric, cmp, params):
+        lo, hi = self._span(self.snapshot_ts, params)
+        grew = self.columns[f"snapshot_delta_{metric}"][lo:hi] > 0
+        seen = np.zeros(self.videos, dtype=bool)
+        seen[self.snapshot_video[lo:hi][grew]] = True
+        return np.count_nonzero(seen)
+
+    def creator_active_days(self, metric, cmp, params):
+        ts = self.video_ts[self._creator_videos(params)]
+        lo, hi = self._span(ts, params)
+        return np.unique(ts[lo:hi] // DAY_US).size
+
+    def creator_published(self, metric, cmp, params):
+        lo, hi = self._span(self.video_ts[self._creator_videos(params)], params)
+        return hi - lo
+
+    def creator_threshold(self, metric, cmp, params):
+        values = self.columns[f"video_{metric}"][self._creator_videos(params)]
+        return np.count_nonzero(OPERATORS[cmp](values, params["threshold"]))
+
+    def distinct_creators_threshold(self, metric, cmp, params):
+        selected = OPERATORS[cmp](self.columns[f"video_{metric}"], params["threshold"])
+        seen = np.zeros(len(self.creators), dtype=bool)
+        seen[self.video_creator[selected]] = True
+        return np.count_nonzero(seen)
+
+    def published_sum(self, metric, cmp, params):
+        lo, hi = self._span(self.video_ts, params)
+        cumulative = self.columns[f"video_cum_{metric}"]
+        return cumulative[hi] - cumulative[lo]
+
+    def published_window(self, metric, cmp, params):
+        lo, hi = self._span(self.video_ts, params)
+        return hi - lo
+
+    def threshold(self, metric, cmp, params):
+        return np.count_nonzero(OPERATORS[cmp](self.columns[f"video_{metric}"], params["threshold"]))
+
+    def got_metric(self, metric, cmp, params):
+        return np.count_nonzero(self.columns[f"video_{metric}"] > 0)
+
+    def creator_videos(self, metric, cmp, params):
+        return len(self._creator_videos(params))
+
+    def total_snapshots(self, metric, cmp, params):
+        return self.snapshots
+
+    def total_videos(self, metric, cmp, params):
+        return self.videos
+
+
+# Template name -> handler; every template in templates.TEMPLATES has one.
+ANSWERS = {name: getattr(ColumnarStore, name) for name, _, _ in set(TEMPLATE_INTENTS.values())}
+
+
+def load_or_build(engine, data_version: int, path: str = COLUMNAR_PATH, build: bool = True):
+    """The saved snapshot for ``data_version``; else (if ``build``) read and save a fresh one."""
+    store = ColumnarStore.load(path, data_version)
+    if store is None and build:
+        store = ColumnarStore.from_database(engine)
+        store.save(path)
+    return store
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import re
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+
+load_dotenv()
+
+
+def get_database_url():
+    """Get database URL - handles ${VARIABLE} expansion"""
+    db_url = os.getenv("DATABASE_URL")
+
+    if db_url:
+        if "${" in db_url:
+            variables = re.findall(r'\$\{([^}]+)\}', db_url)
+            for var in variables:
+                value = os.getenv(var, "")
+                db_url = db_url.replace(f"${{{var}}}", value)
+        return db_url
+
+    DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
+    DB_NAME = os.getenv("POSTGRES_DB", "video_stats")
+    DB_USER = os.getenv("POSTGRES_USER", "postgres")
+    DB_PASSWORD = os.getenv("POSTGRES_PASSWORD", "postgres123")
+    DB_PORT = os.getenv("POSTGRES_PORT", "5432")
+
+    return f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "4"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Session default for every pooled connection; 0 leaves the server setting.
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+
+def create_db_engine(url=None, statement_timeout_ms=None, **overrides):
+    """Engine with the pool settings from the environment; keyword arguments win."""
+    timeout = DB_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+    options = dict(
+        echo=False,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    if timeout > 0:
+        options["connect_args"] = {"options": f"-c statement_timeout={int(timeout)}"}
+    options.update(overrides)
+    return create_engine(url or get_database_url(), **options)
+
+
+DATABASE_URL = get_database_url()
+engine = create_db_engine(DATABASE_URL)
+
+
+# ":name" bind parameters, but not the second colon of a "::type" cast.
+BIND_PARAM = re.compile(r"(?<![:\w]):(\w+)")
+PREPARED_KEY = "prepared_statements"
+
+
+def prepare(conn, sql: str):
+    """PREPARE sql on this connection once; return (statement name, parameter order).
+
+    Prepared statements live as long as the server session, so the names
+    are remembered in the pooled connection's info dict, which SQLAlchemy
+    clears whenever the underlying connection is replaced.
+    """
+    prepared = conn.info.setdefault(PREPARED_KEY, {})
+    if sql in prepared:
+        return prepared[sql]
+
+    names = list(dict.fromkeys(BIND_PARAM.findall(sql)))
+    body = BIND_PARAM.sub(lambda m: f"${names.index(m.group(1)) + 1}", sql.strip().rstrip(";"))
+    name = "q_" + hashlib.sha1(sql.encode()).hexdigest()[:16]
+    conn.execute(text(f"PREPARE {name} AS {body}"))
+    prepared[sql] = (name, names)
+    return prepared[sql]
+
+
+def execute_prepared(conn, sql: str, params: dict, prefix: str = ""):
+    """Run sql with :name bind parameters through a per-connection prepared statement.
+
+    ``prefix`` goes in front of EXECUTE, e.g. "EXPLAIN (FORMAT JSON) " to
+    plan the statement exactly as it runs.
+    """
+    name, names = prepare(conn, sql)
+    if not names:
+        return conn.execute(text(f"{prefix}EXECUTE {name}"))
+    arguments = ", ".join(f":p{i}" for i in range(len(names)))
+    return conn.execute(
+        text(f"{prefix}EXECUTE {name} ({arguments})"),
+        {f"p{i}": params[param] for i, param in enumerate(names)},
+    )
@@ -0,0 +1,314 @@
+import asyncio
+import os
+import time
+import weakref
+
+
+class LLMError(Exception):
+    pass
+
+
+class CircuitOpenError(LLMError):
+    pass
+
+
+class CircuitBreaker:
+    """Stops calling a failing or slow provider for ``reset_timeout`` seconds.
+
+    ``failure_threshold`` consecutive failures (errors, deadlines, or calls
+    slower than ``slow_call`` seconds) open the circuit. After the reset
+    timeout one trial call is let through: success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30, slow_call: float = None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call = slow_call
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._trial_running = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == "open" and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if self.is_open:
+                return False
+            self.state = "half_open"
+            self._trial_running = False
+        if self.state == "half_open":
+            if self._trial_running:
+                return False
+            self._trial_running = True
+        return True
+
+    def record_success(self, duration: float):
+        if self.slow_call is not None and duration > self.slow_call:
+            self.record_failure()
+            return
+        self.state = "closed"
+        self.failures = 0
+        self._trial_running = False
+
+    def abandon(self):
+        """The call that was let through never finished (cancelled)."""
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_running = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class HFBackend:
+    """Hugging Face Inference Providers through ``AsyncInferenceClient``.
+
+    HTTP sessions belong to the event loop that created them, so there is
+    one client per loop; close() closes the running loop's client.
+    """
+
+    def __init__(self, model: str, api_key: str = None, timeout: float = None):
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self._clients = weakref.WeakKeyDictionary()
+
+    async def complete(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            from huggingface_hub import AsyncInferenceClient
+            client = self._clients[loop] = AsyncInferenceClient(api_key=self.api_key, timeout=self.timeout)
+        response = await client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        return response.choices[0].message.content
+
+    async def close(self):
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+
+class OpenAIBackend:
+    """Any OpenAI-compatible ``/chat/completions`` endpoint over a bounded aiohttp pool.
+
+    One session per event loop, like HFBackend.
+    """
+
+    def __init__(self, model: str, base_url: str, api_key: str = None, pool_size: int = 8):
+        self.model = model
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self._sessions = weakref.WeakKeyDictionary()
+
+    async def complete(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else None
+            session = self._sessions[loop] = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                headers=headers,
+            )
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        async with session.post(self.url, json=payload) as response:
+            if response.status != 200:
+                raise LLMError(f"HTTP {response.status} from {self.url}")
+            body = await response.json()
+        return body["choices"][0]["message"]["content"]
+
+    async def close(self):
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+
+class FakeBackend:
+    """Canned completion after ``latency`` seconds; counts calls."""
+
+    def __init__(self, reply: str = "SELECT 0;", latency: float = 0.0):
+        self.reply = reply
+        self.latency = latency
+        self.calls = 0
+
+    async def complete(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self.reply
+
+    async def close(self):
+        pass
+
+
+class LLMGateway:
+    """Front door for all completions: single-flight, deadline, pool limit, breaker.
+
+    Concurrent calls with the same key share one upstream request. Each
+    request, including its wait for a pool slot, must finish within
+    ``timeout`` seconds; only upstream errors and timeouts count towards
+    the breaker, not time spent waiting for a slot. While the breaker is
+    open calls fail at once with CircuitOpenError so callers can fall
+    back to templates only. The pool and in-flight table are kept per
+    event loop; call close() on a loop before it ends to close its
+    upstream sessions.
+    """
+
+    def __init__(self, backend, timeout: float = 10, max_concurrency: int = 4,
+                 breaker: CircuitBreaker = None, single_flight: bool = True,
+                 max_tokens: int = 200, temperature: float = 0.01):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.breaker = breaker or CircuitBreaker()
+        self.single_flight = single_flight
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        # event loop -> (pool semaphore, {key: in-flight task})
+        self._loops = weakref.WeakKeyDictionary()
+        self.requests = 0
+        self.calls = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.queue_timeouts = 0
+        self.errors = 0
+        self.short_circuited = 0
+
+    def _loop_state(self):
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            state = self._loops[loop] = (asyncio.Semaphore(self.max_concurrency), {})
+        return state
+
+    async def complete(self, key: str, prompt: str) -> str:
+        semaphore, inflight = self._loop_state()
+        self.requests += 1
+        if not self.single_flight:
+            return await self._call(prompt, semaphore)
+
+        task = inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call(prompt, semaphore))
+            inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(inflight, key, done))
+        else:
+            self.coalesced += 1
+        # Shielded so one caller giving up does not cancel the others' request.
+        return await asyncio.shield(task)
+
+    def _finish(self, inflight: dict, key: str, task):
+        if inflight.get(key) is task:
+            del inflight[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def _call(self, prompt: str, semaphore) -> str:
+        if self.breaker.is_open:
+            self.short_circuited += 1
+            raise CircuitOpenError("LLM circuit is open")
+
+        upstream = []
+        try:
+            return await asyncio.wait_for(self._limited(prompt, semaphore, upstream), self.timeout)
+        except CircuitOpenError:
+            self.short_circuited += 1
+            raise
+        except asyncio.TimeoutError:
+            if not upstream:
+                # Deadline spent queueing for a slot: our load, not the provider's fault.
+                self.queue_timeouts += 1
+                raise LLMError(f"no LLM pool slot within {self.timeout}s")
+            self.timeouts += 1
+            self.breaker.record_failure()
+            raise LLMError(f"LLM call exceeded {self.timeout}s")
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        except Exception as e:
+            self.errors += 1
+            self.breaker.record_failure()
+            raise LLMError(str(e)) from e
+
+    async def _limited(self, prompt: str, semaphore, upstream: list) -> str:
+        async with semaphore:
+            # Checked again once a slot is free: calls queued behind a
+            # failing provider should not reach it after the circuit opens.
+            if not self.breaker.allow():
+                raise CircuitOpenError("LLM circuit is open")
+            self.calls += 1
+            upstream.append(True)
+            started = time.monotonic()
+            text = await self.backend.complete(prompt, self.max_tokens, self.temperature)
+            self.breaker.record_success(time.monotonic() - started)
+            return text
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "queue_timeouts": self.queue_timeouts,
+            "errors": self.errors,
+            "short_circuited": self.short_circuited,
+            "breaker": self.breaker.state,
+            "trips": self.breaker.trips,
+        }
+
+    async def close(self):
+        """Close the running loop's upstream session and forget its pool."""
+        self._loops.pop(asyncio.get_running_loop(), None)
+        await self.backend.close()
+
+
+def llm_backend_from_env():
+    kind = os.getenv("LLM_BACKEND", "hf").lower()
+    model = os.getenv("LLM_MODEL", "google/gemma-2-2b-it")
+    api_key = os.getenv("LLM_API_KEY") or os.getenv("HF_TOKEN")
+    if kind == "hf":
+        return HFBackend(model, api_key=api_key)
+    if kind == "openai":
+        return OpenAIBackend(
+            model,
+            base_url=os.getenv("LLM_BASE_URL", "http://localhost:8080/v1"),
+            api_key=api_key,
+            pool_size=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+        )
+    if kind == "fake":
+        return FakeBackend(reply=os.getenv("LLM_FAKE_REPLY", "SELECT 0;"))
+    raise ValueError(f"Unknown LLM_BACKEND: {kind}")
+
+
+def gateway_from_env() -> LLMGateway:
+    slow_call = float(os.getenv("LLM_SLOW_CALL", "0"))
+    return LLMGateway(
+        llm_backend_from_env(),
+        timeout=float(os.getenv("LLM_TIMEOUT", "10")),
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30")),
+            slow_call=slow_call or None,
+        ),
+    )
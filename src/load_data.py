@@ -1,117 +1,498 @@
-import json
+import argparse
+import csv
+import glob
+import hashlib
+import io
 import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import column, func, table, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import sessionmaker
+from columnar import COLUMNAR_PATH, ColumnarStore
+from db import create_db_engine
+from video_stream import NDJSON_EXTENSIONS, iter_videos
 
 
-load_dotenv()
-
-
-def get_database_url():
-    """Get database URL - handles ${VARIABLE} expansion"""
-    db_url = os.getenv("DATABASE_URL")
-    
-    if db_url:
-        if "${" in db_url:
-            import re
-            variables = re.findall(r'\$\{([^}]+)\}', db_url)
-            for var in variables:
-                value = os.getenv(var, "")
-                db_url = db_url.replace(f"${{{var}}}", value)
-        return db_url
-    
-    DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
-    DB_NAME = os.getenv("POSTGRES_DB", "video_stats")
-    DB_USER = os.getenv("POSTGRES_USER", "postgres")
-    DB_PASSWORD = os.getenv("POSTGRES_PASSWORD", "postgres123")
-    DB_PORT = os.getenv("POSTGRES_PORT", "5432")
-    
-    return f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-
-
-DATABASE_URL = get_database_url()
-engine = create_engine(DATABASE_URL, echo=False)
+# Bulk loads can legitimately run longer than any per-question statement limit.
+engine = create_db_engine(statement_timeout_ms=0)
 SessionLocal = sessionmaker(bind=engine)
 
+DEFAULT_JSON_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "videos.json")
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "migrations")
+LOAD_MODES = ("row", "batch", "copy")
+PARTITION_GRANULARITY = os.getenv("SNAPSHOT_PARTITION_GRANULARITY", "month")
+PARTITION_MONTHS_AHEAD = int(os.getenv("SNAPSHOT_PARTITION_MONTHS_AHEAD", "3"))
+USE_COLUMNAR = os.getenv("USE_COLUMNAR", "false").lower() == "true"
 
-def load_data():
-    JSON_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "videos.json")
-    
-    print(f"Loading data from: {JSON_PATH}")
-    print(f"Database URL: {DATABASE_URL}")
-    
-    with open(JSON_PATH, "r", encoding="utf-8") as f:
-        raw_data = json.load(f)
+VIDEO_COLUMNS = (
+    "id", "creator_id", "video_created_at",
+    "views_count", "likes_count", "comments_count", "reports_count",
+)
+SNAPSHOT_COLUMNS = (
+    "id", "video_id", "created_at",
+    "views_count", "likes_count", "comments_count", "reports_count",
+    "delta_views_count", "delta_likes_count",
+    "delta_comments_count", "delta_reports_count",
+)
 
-    if isinstance(raw_data, list):
-        videos_data = raw_data
-    elif isinstance(raw_data, dict) and "videos" in raw_data:
-        videos_data = raw_data["videos"]
+VIDEO_TOTAL_COLUMNS = ("views_count", "likes_count", "comments_count", "reports_count")
+
+videos_table = table("videos", *(column(name) for name in VIDEO_COLUMNS + ("updated_at",)))
+snapshots_table = table("video_snapshots", *(column(name) for name in SNAPSHOT_COLUMNS))
+
+VIDEO_INSERT = text("""
+    INSERT INTO videos (
+        id, creator_id, video_created_at,
+        views_count, likes_count, comments_count, reports_count,
+        created_at, updated_at
+    ) VALUES (
+        :id, :creator_id, :video_created_at,
+        :views_count, :likes_count, :comments_count, :reports_count,
+        NOW(), NOW()
+    ) ON CONFLICT (id) DO NOTHING
+""")
+
+VIDEO_UPSERT = text("""
+    INSERT INTO videos (
+        id, creator_id, video_created_at,
+        views_count, likes_count, comments_count, reports_count,
+        created_at, updated_at
+    ) VALUES (
+        :id, :creator_id, :video_created_at,
+        :views_count, :likes_count, :comments_count, :reports_count,
+        NOW(), NOW()
+    ) ON CONFLICT (id) DO UPDATE SET
+        views_count = EXCLUDED.views_count,
+        likes_count = EXCLUDED.likes_count,
+        comments_count = EXCLUDED.comments_count,
+        reports_count = EXCLUDED.reports_count,
+        updated_at = NOW()
+    WHERE (videos.views_count, videos.likes_count, videos.comments_count, videos.reports_count)
+        IS DISTINCT FROM (EXCLUDED.views_count, EXCLUDED.likes_count, EXCLUDED.comments_count, EXCLUDED.reports_count)
+""")
+
+# No conflict target: the key is (id) on a plain table and (id, created_at)
+# once video_snapshots is partitioned, so load_data drops stored ids itself
+# (drop_stored_snapshots) before inserting.
+SNAPSHOT_INSERT = text("""
+    INSERT INTO video_snapshots (
+        id, video_id, created_at,
+        views_count, likes_count, comments_count, reports_count,
+        delta_views_count, delta_likes_count,
+        delta_comments_count, delta_reports_count,
+        updated_at
+    ) VALUES (
+        :id, :video_id, :created_at,
+        :views_count, :likes_count, :comments_count, :reports_count,
+        :delta_views_count, :delta_likes_count,
+        :delta_comments_count, :delta_reports_count,
+        NOW()
+    ) ON CONFLICT DO NOTHING
+""")
+
+
+INGEST_META_DDL = """
+    CREATE TABLE IF NOT EXISTS ingest_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+"""
+
+
+SCHEMA_MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        name TEXT PRIMARY KEY,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+"""
+BASELINE_MIGRATION = "01_create_tables.sql"
+
+
+def apply_migrations(directory=MIGRATIONS_DIR):
+    """Run the migrations/*.sql not yet recorded in schema_migrations, in name order
+
+    Postgres only runs docker-entrypoint-initdb.d on an empty volume, so this
+    is what brings an existing database up to date.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, "*.sql")))
+    # Raw DBAPI cursor: migrations contain plpgsql bodies and literal '%'.
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext('load_data.apply_migrations'))")
+        cursor.execute("SELECT to_regclass('schema_migrations') IS NULL AND to_regclass('videos') IS NOT NULL")
+        unrecorded = cursor.fetchone()[0]
+        cursor.execute(SCHEMA_MIGRATIONS_DDL)
+        if unrecorded:
+            # Tables made by initdb or by a load_data that did not record
+            # migrations yet: 01 has run, the later files are safe to re-run.
+            cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (BASELINE_MIGRATION,))
+        cursor.execute("SELECT name FROM schema_migrations")
+        applied = {name for (name,) in cursor.fetchall()}
+        pending = [path for path in paths if os.path.basename(path) not in applied]
+        for path in pending:
+            with open(path, encoding="utf-8") as f:
+                cursor.execute(f.read())
+            cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (os.path.basename(path),))
+            print(f"  applied {os.path.basename(path)}")
+        raw.commit()
+    finally:
+        raw.close()
+    print(f"{len(pending)} new migration(s) of {len(paths)} in {directory}")
+
+
+def bump_data_version(session):
+    """Increment the data version so the bot drops cached query results"""
+    session.execute(text(INGEST_META_DDL))
+    session.execute(text("""
+        INSERT INTO ingest_meta (key, value, updated_at) VALUES ('data_version', '1', NOW())
+        ON CONFLICT (key) DO UPDATE
+        SET value = (ingest_meta.value::bigint + 1)::text, updated_at = NOW()
+    """))
+
+
+def snapshots_partitioned(session) -> bool:
+    return session.execute(text("""
+        SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('video_snapshots'))
+    """)).scalar()
+
+
+def ensure_partitions(session, oldest, newest):
+    """Create the video_snapshots partitions covering [oldest, newest]"""
+    created = session.execute(
+        text("SELECT ensure_snapshot_partitions(:oldest, :newest, :granularity)"),
+        {"oldest": oldest, "newest": newest, "granularity": PARTITION_GRANULARITY},
+    ).scalar()
+    if created:
+        print(f"  created {created} video_snapshots partition(s)")
+
+
+def refresh_rollups(session, since=None):
+    """Rebuild rollup buckets from ``since`` onwards (everything when None)"""
+    installed = session.execute(text("SELECT to_regprocedure('refresh_rollups(timestamptz)')")).scalar()
+    if installed is None:
+        print("Rollup tables are not installed, skipping refresh.")
+        return
+    session.execute(text("SELECT refresh_rollups(:since)"), {"since": since})
+
+
+def video_row(video) -> dict:
+    return {
+        "id": video["id"],
+        "creator_id": str(video["creator_id"]),
+        "video_created_at": video["video_created_at"],
+        "views_count": video.get("views_count", 0),
+        "likes_count": video.get("likes_count", 0),
+        "comments_count": video.get("comments_count", 0),
+        "reports_count": video.get("reports_count", 0),
+    }
+
+
+def snapshot_row(video_id, snap) -> dict:
+    return {
+        "id": snap["id"],
+        "video_id": video_id,
+        "created_at": snap["created_at"],
+        "views_count": snap.get("views_count", 0),
+        "likes_count": snap.get("likes_count", 0),
+        "comments_count": snap.get("comments_count", 0),
+        "reports_count": snap.get("reports_count", 0),
+        "delta_views_count": snap.get("delta_views_count", 0),
+        "delta_likes_count": snap.get("delta_likes_count", 0),
+        "delta_comments_count": snap.get("delta_comments_count", 0),
+        "delta_reports_count": snap.get("delta_reports_count", 0),
+    }
+
+
+def iter_row_batches(videos, batch_size, max_snapshots=None):
+    """Group videos into batches of (video rows, snapshot rows)
+
+    A batch is flushed after ``batch_size`` videos or once it holds
+    ``max_snapshots`` snapshot rows, whichever comes first.
+    """
+    max_snapshots = max_snapshots or batch_size * 100
+    video_rows, snapshot_rows = [], []
+    for video in videos:
+        video_rows.append(video_row(video))
+        for snap in video.get("snapshots") or ():
+            snapshot_rows.append(snapshot_row(video["id"], snap))
+        if len(video_rows) >= batch_size or len(snapshot_rows) >= max_snapshots:
+            yield video_rows, snapshot_rows
+            video_rows, snapshot_rows = [], []
+    if video_rows:
+        yield video_rows, snapshot_rows
+
+
+def drop_stored_snapshots(session, snapshot_rows):
+    """Keep only the snapshots whose id is not in video_snapshots yet.
+
+    An id repeated within the batch keeps its first occurrence, as
+    ON CONFLICT DO NOTHING would on a table keyed by id alone.
+    """
+    if not snapshot_rows:
+        return snapshot_rows
+    seen = set(session.execute(
+        text("SELECT id FROM video_snapshots WHERE id = ANY(:ids)"),
+        {"ids": list({row["id"] for row in snapshot_rows})},
+    ).scalars())
+    kept = []
+    for row in snapshot_rows:
+        if row["id"] not in seen:
+            seen.add(row["id"])
+            kept.append(row)
+    return kept
+
+
+def insert_rows_one_by_one(session, video_rows, snapshot_rows, upsert=False):
+    video_insert = VIDEO_UPSERT if upsert else VIDEO_INSERT
+    for row in video_rows:
+        session.execute(video_insert, row)
+    for row in snapshot_rows:
+        session.execute(SNAPSHOT_INSERT, row)
+
+
+def insert_rows_batched(session, video_rows, snapshot_rows, upsert=False):
+    # Core inserts with a list of rows are sent as multi-row VALUES statements;
+    # created_at/updated_at fall back to the column defaults.
+    video_insert = pg_insert(videos_table)
+    if upsert:
+        video_insert = video_insert.on_conflict_do_update(
+            index_elements=["id"],
+            set_={**{name: video_insert.excluded[name] for name in VIDEO_TOTAL_COLUMNS},
+                  "updated_at": func.now()},
+            where=tuple_(*(videos_table.c[name] for name in VIDEO_TOTAL_COLUMNS)).is_distinct_from(
+                tuple_(*(video_insert.excluded[name] for name in VIDEO_TOTAL_COLUMNS))
+            ),
+        )
+        video_rows = list({row["id"]: row for row in video_rows}.values())
     else:
-        raise ValueError("JSON format not recognized. Expected array or object with 'videos' key.")
+        video_insert = video_insert.on_conflict_do_nothing(index_elements=["id"])
+    session.execute(video_insert, video_rows)
+    if snapshot_rows:
+        session.execute(pg_insert(snapshots_table).on_conflict_do_nothing(), snapshot_rows)
+
+
+def _copy_into(cursor, table_name, columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[name] for name in columns])
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+    )
+
+
+def copy_rows(session, video_rows, snapshot_rows, upsert=False):
+    """COPY a batch into temp staging tables, then merge with one INSERT ... SELECT each"""
+    cursor = session.connection().connection.cursor()
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS staging_videos
+            (LIKE videos INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;
+        CREATE TEMP TABLE IF NOT EXISTS staging_snapshots
+            (LIKE video_snapshots INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;
+    """)
+
+    video_columns = ", ".join(VIDEO_COLUMNS)
+    if upsert:
+        # The last occurrence of a video in the input wins, as in the other writers.
+        video_rows = list({row["id"]: row for row in video_rows}.values())
+    _copy_into(cursor, "staging_videos", VIDEO_COLUMNS, video_rows)
+    if upsert:
+        current_totals = ", ".join(f"videos.{name}" for name in VIDEO_TOTAL_COLUMNS)
+        excluded_totals = ", ".join(f"EXCLUDED.{name}" for name in VIDEO_TOTAL_COLUMNS)
+        assignments = ", ".join(f"{name} = EXCLUDED.{name}" for name in VIDEO_TOTAL_COLUMNS)
+        cursor.execute(f"""
+            INSERT INTO videos ({video_columns}, created_at, updated_at)
+            SELECT {video_columns}, NOW(), NOW() FROM staging_videos
+            ON CONFLICT (id) DO UPDATE SET {assignments}, updated_at = NOW()
+            WHERE ({current_totals}) IS DISTINCT FROM ({excluded_totals})
+        """)
+    else:
+        cursor.execute(f"""
+            INSERT INTO videos ({video_columns}, created_at, updated_at)
+            SELECT {video_columns}, NOW(), NOW() FROM staging_videos
+            ON CONFLICT (id) DO NOTHING
+        """)
+
+    if snapshot_rows:
+        snapshot_columns = ", ".join(SNAPSHOT_COLUMNS)
+        _copy_into(cursor, "staging_snapshots", SNAPSHOT_COLUMNS, snapshot_rows)
+        cursor.execute(f"""
+            INSERT INTO video_snapshots ({snapshot_columns}, updated_at)
+            SELECT {snapshot_columns}, NOW() FROM staging_snapshots
+            ON CONFLICT DO NOTHING
+        """)
+    cursor.close()
+
+
+WRITERS = {
+    "row": insert_rows_one_by_one,
+    "batch": insert_rows_batched,
+    "copy": copy_rows,
+}
+
+
+def _parse_timestamp(value) -> datetime:
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def file_fingerprint(path, prefix_size=None):
+    """Return (size, sha256 of the whole file, sha256 of its first prefix_size bytes)"""
+    digest = hashlib.sha256()
+    prefix_digest = None
+    read = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(1 << 20)
+            if not chunk:
+                break
+            if prefix_size is not None and read < prefix_size <= read + len(chunk):
+                prefix_digest = digest.copy()
+                prefix_digest.update(chunk[:prefix_size - read])
+            digest.update(chunk)
+            read += len(chunk)
+    if prefix_size == 0:
+        prefix_digest = hashlib.sha256()
+    return read, digest.hexdigest(), prefix_digest.hexdigest() if prefix_digest else None
+
+
+def read_ingest_state(session) -> dict:
+    session.execute(text(INGEST_META_DDL))
+    rows = session.execute(text("SELECT key, value FROM ingest_meta")).all()
+    return dict(rows)
+
+
+def write_ingest_state(session, state: dict):
+    for key, value in state.items():
+        session.execute(text("""
+            INSERT INTO ingest_meta (key, value, updated_at) VALUES (:key, :value, NOW())
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = NOW()
+        """), {"key": key, "value": str(value)})
+
+
+def plan_sync(json_path, state: dict):
+    """Decide what an incremental sync has to read.
+
+    Returns (fingerprint state, byte offset to start from), or None when the
+    file is unchanged since the last sync.
+    """
+    old_size = int(state.get("source_size", -1))
+    ndjson = os.path.splitext(json_path)[1].lower() in NDJSON_EXTENSIONS
+    prefix_size = old_size if ndjson and old_size >= 0 else None
+    size, sha256, prefix_sha256 = file_fingerprint(json_path, prefix_size)
+    fingerprint = {"source_path": os.path.abspath(json_path), "source_size": size, "source_sha256": sha256}
+
+    if state.get("source_path") == fingerprint["source_path"] and state.get("source_sha256") == sha256:
+        return None
+
+    offset = 0
+    # An NDJSON file that only grew can be resumed where the last sync stopped.
+    if (state.get("source_path") == fingerprint["source_path"] and prefix_sha256
+            and prefix_sha256 == state.get("source_sha256") and size > old_size):
+        offset = old_size
+    return fingerprint, offset
+
+
+def write_columnar_snapshot(path=COLUMNAR_PATH):
+    """Save the loaded tables as memory-mappable NumPy columns for the bot's fast path"""
+    started = time.perf_counter()
+    store = ColumnarStore.from_database(engine)
+    directory = store.save(path)
+    print(f"Columnar snapshot v{store.data_version} ({store.videos} videos, {store.snapshots} snapshots) "
+          f"written to {directory} in {time.perf_counter() - started:.1f}s")
+    return directory
+
+
+def load_data(json_path=None, mode="copy", batch_size=1000, incremental=False, columnar=None,
+              migrate=True):
+    json_path = json_path or DEFAULT_JSON_PATH
+    if mode not in WRITERS:
+        raise ValueError(f"Unknown load mode: {mode}. Expected one of {', '.join(LOAD_MODES)}.")
+    write_batch = WRITERS[mode]
+
+    print(f"Loading data from: {json_path}")
+    print(f"Database: {engine.url.host}/{engine.url.database}")
+    print(f"Mode: {mode}, batch size: {batch_size} videos, incremental: {incremental}")
+    if migrate:
+        apply_migrations()
 
     session = SessionLocal()
+    started = time.perf_counter()
+    total_videos = total_snapshots = 0
     try:
-        print(f"Found {len(videos_data)} videos. Starting insert...")
-
-        for video in videos_data:
-            video_insert = text("""
-                INSERT INTO videos (
-                    id, creator_id, video_created_at,
-                    views_count, likes_count, comments_count, reports_count,
-                    created_at, updated_at
-                ) VALUES (
-                    :id, :creator_id, :video_created_at,
-                    :views_count, :likes_count, :comments_count, :reports_count,
-                    NOW(), NOW()
-                ) ON CONFLICT (id) DO NOTHING
-            """)
-
-            session.execute(video_insert, {
-                "id": video["id"],
-                "creator_id": str(video["creator_id"]),
-                "video_created_at": video["video_created_at"],
-                "views_count": video.get("views_count", 0),
-                "likes_count": video.get("likes_count", 0),
-                "comments_count": video.get("comments_count", 0),
-                "reports_count": video.get("reports_count", 0),
-            })
-
-            if "snapshots" in video and video["snapshots"]:
-                snapshot_insert = text("""
-                    INSERT INTO video_snapshots (
-                        id, video_id, created_at,
-                        views_count, likes_count, comments_count, reports_count,
-                        delta_views_count, delta_likes_count,
-                        delta_comments_count, delta_reports_count,
-                        updated_at
-                    ) VALUES (
-                        :id, :video_id, :created_at,
-                        :views_count, :likes_count, :comments_count, :reports_count,
-                        :delta_views_count, :delta_likes_count,
-                        :delta_comments_count, :delta_reports_count,
-                        NOW()
-                    ) ON CONFLICT (id) DO NOTHING
-                """)
-
-                for snap in video["snapshots"]:
-                    session.execute(snapshot_insert, {
-                        "id": snap["id"],
-                        "video_id": video["id"],
-                        "created_at": snap["created_at"],
-                        "views_count": snap.get("views_count", 0),
-                        "likes_count": snap.get("likes_count", 0),
-                        "comments_count": snap.get("comments_count", 0),
-                        "reports_count": snap.get("reports_count", 0),
-                        "delta_views_count": snap.get("delta_views_count", 0),
-                        "delta_likes_count": snap.get("delta_likes_count", 0),
-                        "delta_comments_count": snap.get("delta_comments_count", 0),
-                        "delta_reports_count": snap.get("delta_reports_count", 0),
-                    })
+        state = read_ingest_state(session)
+        partitioned = snapshots_partitioned(session)
+        offset = 0
+        digest = None
+        if incremental:
+            plan = plan_sync(json_path, state)
+            if plan is None:
+                print("Input unchanged since the last sync, nothing to do.")
+                return 0, 0
+            fingerprint, offset = plan
+            print(f"Syncing from byte {offset}")
+        else:
+            # Fingerprint the input while streaming it instead of reading it twice.
+            digest = hashlib.sha256()
+
+        newest = _parse_timestamp(state["snapshot_watermark"]) if state.get("snapshot_watermark") else None
+        oldest_new = None
+        print("Streaming videos. Starting insert...")
 
+        videos = iter_videos(json_path, offset=offset, digest=digest)
+        for video_rows, snapshot_rows in iter_row_batches(videos, batch_size):
+            if snapshot_rows:
+                batch_newest = max(_parse_timestamp(row["created_at"]) for row in snapshot_rows)
+                newest = max(newest, batch_newest) if newest else batch_newest
+            # Late and backfilled snapshots are new too; only ids already
+            # stored are skipped, whatever their created_at. A partitioned
+            # table's key includes created_at, so ON CONFLICT alone would let
+            # an id through again under another timestamp. What is left is
+            # exactly what the rollups have to catch up on.
+            snapshot_rows = drop_stored_snapshots(session, snapshot_rows)
+            if snapshot_rows:
+                batch_oldest = min(_parse_timestamp(row["created_at"]) for row in snapshot_rows)
+                oldest_new = min(oldest_new, batch_oldest) if oldest_new else batch_oldest
+
+            if partitioned and snapshot_rows:
+                created = [_parse_timestamp(row["created_at"]) for row in snapshot_rows]
+                ensure_partitions(session, min(created), max(created))
+            write_batch(session, video_rows, snapshot_rows, upsert=incremental)
+            session.commit()
+
+            total_videos += len(video_rows)
+            total_snapshots += len(snapshot_rows)
+            elapsed = time.perf_counter() - started
+            rate = (total_videos + total_snapshots) / elapsed if elapsed else 0
+            print(f"  {total_videos} videos, {total_snapshots} snapshots ({rate:,.0f} rows/s)")
+
+        if digest is not None:
+            fingerprint = {"source_path": os.path.abspath(json_path),
+                           "source_size": os.path.getsize(json_path),
+                           "source_sha256": digest.hexdigest()}
+        if newest is not None:
+            # Kept for monitoring; snapshots are filtered by id, not by this.
+            fingerprint["snapshot_watermark"] = newest.isoformat()
+        if partitioned:
+            # Keep empty partitions ready ahead of time for the next syncs.
+            now = datetime.now(timezone.utc)
+            ensure_partitions(session, now, now + timedelta(days=31 * PARTITION_MONTHS_AHEAD))
+        write_ingest_state(session, fingerprint)
+        # Only buckets touched by new snapshots; creator totals always. A
+        # full load of data already stored leaves the buckets alone.
+        refresh_rollups(session, oldest_new or "infinity")
+        bump_data_version(session)
         session.commit()
-        print(f"Successfully loaded {len(videos_data)} videos!")
+        elapsed = time.perf_counter() - started
+        print(f"Successfully loaded {total_videos} videos and {total_snapshots} snapshots "
+              f"in {elapsed:.1f}s!")
+        if USE_COLUMNAR if columnar is None else columnar:
+            write_columnar_snapshot()
+        return total_videos, total_snapshots
 
     except Exception as e:
         session.rollback()
@@ -119,7 +500,32 @@ def load_data():
         raise
     finally:
         session.close()
-        
-        
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load videos JSON into PostgreSQL")
+    parser.add_argument("path", nargs="?", default=os.getenv("LOAD_DATA_PATH", DEFAULT_JSON_PATH))
+    parser.add_argument("--mode", choices=LOAD_MODES, default=os.getenv("LOAD_MODE", "copy"))
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("LOAD_BATCH_SIZE", "1000")))
+    parser.add_argument("--incremental", action="store_true",
+                        default=os.getenv("LOAD_INCREMENTAL", "false").lower() == "true",
+                        help="skip unchanged input, upsert video totals, append only new snapshot ids")
+    parser.add_argument("--columnar", action="store_true", default=USE_COLUMNAR,
+                        help="also write the NumPy columnar snapshot the bot memory-maps")
+    parser.add_argument("--interval", type=float, default=float(os.getenv("LOAD_INTERVAL", "0")),
+                        help="repeat an incremental sync every N seconds")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    load_data()
\ No newline at end of file
+    args = parse_args()
+    if args.interval:
+        migrate = True
+        while True:
+            load_data(args.path, mode=args.mode, batch_size=args.batch_size, incremental=True,
+                      columnar=args.columnar, migrate=migrate)
+            migrate = False
+            time.sleep(args.interval)
+    else:
+        load_data(args.path, mode=args.mode, batch_size=args.batch_size, incremental=args.incremental,
+                  columnar=args.columnar)
@@ -0,0 +1,168 @@
+import bisect
+import logging
+import threading
+import time
+
+
+_registry = []
+_lock = threading.Lock()
+
+
+def _label_text(labelnames, values) -> str:
+    if not labelnames:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(labelnames, map(str, values)))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels) -> tuple:
+        return tuple([labels[name] for name in self.labelnames])
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with _lock:
+            items = sorted(self._values.items(), key=lambda item: tuple(map(str, item[0])))
+        for key, value in items:
+            yield f"{self.name}{_label_text(self.labelnames, key)} {value}"
+
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        self._observe(tuple([labels[name] for name in self.labelnames]), value)
+
+    def _observe(self, key: tuple, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with _lock:
+            items = [(key, (list(s[0]), s[1], s[2])) for key, s in self._series.items()]
+        items.sort(key=lambda item: tuple(map(str, item[0])))
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                labels = _label_text(self.labelnames + ("le",), key + (str(bound),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _label_text(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {total}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Gauge:
+    """Value read from ``read()`` at scrape time.
+
+    With ``labelnames``, ``read()`` returns {label values tuple: value}.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, read, labelnames=()):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+        if not self.labelnames:
+            yield f"{self.name} {self.read()}"
+            return
+        for key, value in sorted(self.read().items(), key=lambda item: tuple(map(str, item[0]))):
+            yield f"{self.name}{_label_text(self.labelnames, key)} {value}"
+
+
+class CallbackCounter(Gauge):
+    """Counter kept by another object (e.g. a cache) and read at scrape time."""
+
+    type = "counter"
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "bot_stage_seconds", "Time spent in each stage of answering a question", ("stage",))
+TEMPLATE_HITS = Counter("bot_template_hits_total", "Questions answered by a SQL template", ("template",))
+LLM_CALLS = Counter("bot_llm_calls_total", "Questions sent to the model, by outcome", ("outcome",))
+FALLBACKS = Counter("bot_fallbacks_total", "Answers that fell back to 0", ("reason",))
+CACHE_HITS = Counter("bot_cache_hits_total", "SQL and result cache hits", ("cache",))
+SQL_ERRORS = Counter("bot_sql_errors_total", "Failed database queries", ("query",))
+SLOW_QUERIES = Counter("bot_slow_queries_total", "Queries slower than SLOW_QUERY_MS")
+
+slow_query_log = logging.getLogger("slow_query")
+
+
+class stage:
+    """``with stage("db"):`` records the block's duration in bot_stage_seconds."""
+
+    __slots__ = ("key", "started")
+
+    def __init__(self, name: str):
+        self.key = (name,)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        STAGE_SECONDS._observe(self.key, time.perf_counter() - self.started)
+
+
+async def start_metrics_server(port: int, host: str = "0.0.0.0"):
+    """Serve /metrics on its own aiohttp runner; returns the runner for cleanup()."""
+    from aiohttp import web
+
+    async def metrics(request):
+        return web.Response(body=render().encode(),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -1,225 +1,432 @@
-import os
-import sys
-import warnings
-import re
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import SQLAlchemyError
-import logging
-from huggingface_hub import InferenceClient
-
-
-warnings.filterwarnings('ignore')
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
-
-
-logging.getLogger('sqlalchemy').setLevel(logging.CRITICAL)
-logging.getLogger('httpx').setLevel(logging.CRITICAL)
-logging.getLogger('urllib3').setLevel(logging.CRITICAL)
-
-
-class NullWriter:
-    def write(self, message):
-        pass
-    def flush(self):
-        pass
-
-
-original_stdout = sys.stdout
-original_stderr = sys.stderr
-
-
-sys.stdout = NullWriter()
-sys.stderr = NullWriter()
-sys.stdout = original_stdout
-sys.stderr = original_stderr
-
-
-load_dotenv()
-
-
-def get_database_url():
-    db_url = os.getenv("DATABASE_URL")
-    
-    if db_url:
-        if "${" in db_url:
-            import re
-            variables = re.findall(r'\$\{([^}]+)\}', db_url)
-            for var in variables:
-                value = os.getenv(var, "")
-                db_url = db_url.replace(f"${{{var}}}", value)
-        return db_url
-    
-    DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
-    DB_NAME = os.getenv("POSTGRES_DB", "video_stats")
-    DB_USER = os.getenv("POSTGRES_USER", "postgres")
-    DB_PASSWORD = os.getenv("POSTGRES_PASSWORD", "postgres123")
-    DB_PORT = os.getenv("POSTGRES_PORT", "5432")
-    
-    return f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-
-
-DATABASE_URL = get_database_url()
-engine = create_engine(DATABASE_URL, echo=False)
-HF_TOKEN = os.getenv("HF_TOKEN")
-client = InferenceClient(api_key=HF_TOKEN)
-
-
-def generate_sql_with_ai(question: str) -> str:
-    question_lower = question.lower()
-    
-    if 'aca1061a9d324ecf8c3fa2bb32d7be63' in question and '10000' in question:
-        return "SELECT COUNT(*) FROM videos WHERE creator_id = 'aca1061a9d324ecf8c3fa2bb32d7be63' AND views_count > 10000;"
-    
-    if '8b76e572635b400c9052286a56176e03' in question and '1 ноября 2025' in question and '5 ноября 2025' in question:
-        return "SELECT COUNT(*) FROM videos WHERE creator_id = '8b76e572635b400c9052286a56176e03' AND video_created_at >= '2025-11-01 00:00:00+00' AND video_created_at <= '2025-11-05 23:59:59+00';"
-    
-    if 'сколько всего есть замеров статистики' in question_lower and 'отрицательным' in question_lower:
-        return "SELECT COUNT(*) FROM video_snapshots WHERE delta_views_count < 0;"
-    
-    if 'cd87be38b50b4fdd8342bb3c383f3c7d' in question and '10:00 до 15:00' in question and '28 ноября 2025' in question:
-        return "SELECT COALESCE(SUM(vs.delta_views_count), 0) FROM video_snapshots vs JOIN videos v ON vs.video_id = v.id WHERE v.creator_id = 'cd87be38b50b4fdd8342bb3c383f3c7d' AND vs.created_at >= '2025-11-28 10:00:00+00' AND vs.created_at <= '2025-11-28 15:00:00+00';"
-    
-    if 'июне 2025' in question and 'суммарное количество просмотров' in question_lower:
-        return "SELECT COALESCE(SUM(views_count), 0) FROM videos WHERE EXTRACT(YEAR FROM video_created_at) = 2025 AND EXTRACT(MONTH FROM video_created_at) = 6;"
-    
-    if 'сколько разных креаторов имеют хотя бы одно видео' in question_lower and '100000' in question:
-        return "SELECT COUNT(DISTINCT creator_id) FROM videos WHERE views_count > 100000;"
-    
-    if question.strip() == "Сколько видео получило лайки?":
-        return "SELECT COUNT(*) FROM videos WHERE likes_count > 0;"
-    
-    if 'сколько видео набрало больше 100000 просмотров' in question_lower:
-        return "SELECT COUNT(*) FROM videos WHERE views_count > 100000;"
-    
-    if 'на сколько просмотров в сумме выросли все видео 28 ноября 2025' in question_lower:
-        return "SELECT COALESCE(SUM(delta_views_count), 0) FROM video_snapshots WHERE created_at >= '2025-11-28 00:00:00+00' AND created_at <= '2025-11-28 23:59:59+00';"
-    
-    if 'сколько разных видео получали новые просмотры 27 ноября 2025' in question_lower:
-        return "SELECT COUNT(DISTINCT video_id) FROM video_snapshots WHERE created_at >= '2025-11-27 00:00:00+00' AND created_at <= '2025-11-27 23:59:59+00' AND delta_views_count > 0;"
-    
-    if ('креатора с id aca1061a9d324ecf8c3fa2bb32d7be63' in question_lower and 
-        'разных календарных днях ноября 2025' in question_lower and
-        'публиковал хотя бы одно видео' in question_lower):
-        return "SELECT COUNT(DISTINCT DATE(video_created_at)) FROM videos WHERE creator_id = 'aca1061a9d324ecf8c3fa2bb32d7be63' AND video_created_at >= '2025-11-01 00:00:00+00' AND video_created_at < '2025-12-01 00:00:00+00';"    
-
-    if ('разных календарных днях' in question_lower and 'ноября 2025' in question_lower and
-        'публиковал хотя бы одно видео' in question_lower and 'креатора с id' in question_lower):
-        creator_match = re.search(r'креатора с id\s+(\S+)', question_lower)
-        if creator_match:
-            creator_id = creator_match.group(1)
-            return f"SELECT COUNT(DISTINCT EXTRACT(DAY FROM video_created_at)) FROM videos WHERE creator_id = '{creator_id}' AND EXTRACT(YEAR FROM video_created_at) = 2025 AND EXTRACT(MONTH FROM video_created_at) = 11;"
-    
-    prompt = f"""Ты SQL эксперт. Создай SQL запрос для PostgreSQL.
-
-ВОПРОС: "{question}"
-
-СХЕМА:
-1. videos(id, creator_id, video_created_at, views_count, likes_count, comments_count, reports_count)
-2. video_snapshots(id, video_id, created_at, delta_views_count, delta_likes_count, delta_comments_count, delta_reports_count)
-
-ПРАВИЛА:
-1. Для итоговой статистики ("набрали", "получили", "итого", "всего", "опубликовал") используй таблицу videos
-2. Для изменений ("выросли", "получили новые", "изменилось", "за период") используй таблицу video_snapshots
-3. Для "разных/уникальных" используй DISTINCT
-4. Для "суммарно", "всего", "общее количество" используй SUM с COALESCE
-5. Все timestamp должны заканчиваться на '+00'
-6. JOIN нужен ТОЛЬКО если нужно связать video_snapshots с videos по creator_id
-7. Не добавляй фильтры по дате если их нет в вопросе
-8. Для подсчета РАЗНЫХ КАЛЕНДАРНЫХ ДНЕЙ в месяце используй COUNT(DISTINCT EXTRACT(DAY FROM column))
-
-ВАЖНЫЕ ПРИМЕРЫ:
-1. "Сколько видео получило лайки?" → SELECT COUNT(*) FROM videos WHERE likes_count > 0;
-2. "Сколько видео набрали больше 10000 просмотров?" → SELECT COUNT(*) FROM videos WHERE views_count > 10000;
-3. "Сколько видео у креатора с id X набрали больше 10000 просмотров?" → SELECT COUNT(*) FROM videos WHERE creator_id = 'X' AND views_count > 10000;
-4. "Сколько видео опубликовал креатор с id Y в период с 1 по 5 ноября 2025?" → SELECT COUNT(*) FROM videos WHERE creator_id = 'Y' AND video_created_at >= '2025-11-01 00:00:00+00' AND video_created_at <= '2025-11-05 23:59:59+00';
-5. "Сколько всего есть замеров статистики, в которых число просмотров за час оказалось отрицательным?" → SELECT COUNT(*) FROM video_snapshots WHERE delta_views_count < 0;
-6. "На сколько просмотров суммарно выросли все видео креатора с id X в промежутке с 10:00 до 15:00 28 ноября 2025 года?" → SELECT COALESCE(SUM(vs.delta_views_count), 0) FROM video_snapshots vs JOIN videos v ON vs.video_id = v.id WHERE v.creator_id = 'X' AND vs.created_at >= '2025-11-28 10:00:00+00' AND vs.created_at <= '2025-11-28 15:00:00+00';
-7. "Какое суммарное количество просмотров набрали все видео, опубликованные в июне 2025 года?" → SELECT COALESCE(SUM(views_count), 0) FROM videos WHERE EXTRACT(YEAR FROM video_created_at) = 2025 AND EXTRACT(MONTH FROM video_created_at) = 6;
-8. "Сколько разных креаторов имеют хотя бы одно видео с >100000 просмотров?" → SELECT COUNT(DISTINCT creator_id) FROM videos WHERE views_count > 100000;
-9. "В скольких разных календарных днях ноября 2025 года креатор публиковал хотя бы одно видео?" → SELECT COUNT(DISTINCT EXTRACT(DAY FROM video_created_at)) FROM videos WHERE creator_id = 'ID' AND EXTRACT(YEAR FROM video_created_at) = 2025 AND EXTRACT(MONTH FROM video_created_at) = 11;
-
-SQL (только SQL):
-"""
-    
-    try:
-        response = client.chat.completions.create(
-            model="google/gemma-2-2b-it",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.01,
-            max_tokens=200
-        )
-        
-        sql = response.choices[0].message.content.strip()
-        
-        sql = re.sub(r'```sql\s*', '', sql, flags=re.IGNORECASE)
-        sql = re.sub(r'\s*```', '', sql)
-        sql = sql.strip()
-        
-        if 'SELECT' in sql.upper():
-            select_pos = sql.upper().find('SELECT')
-            sql = sql[select_pos:]
-            
-            if ';' in sql:
-                sql = sql[:sql.find(';') + 1]
-            else:
-                sql = sql.split('\n')[0].strip() + ';'
-        else:
-            sql = "SELECT 0;"
-        
-        timestamp_pattern = r"'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})'"
-        sql = re.sub(timestamp_pattern, r"'\1+00'", sql)
-        
-        date_pattern = r"'(\d{4}-\d{2}-\d{2})'"
-        sql = re.sub(date_pattern, r"'\1 00:00:00+00'", sql)
-        
-        return sql
-        
-    except Exception as e:
-        return "SELECT 0;"
-
-
-def natural_language_to_sql(user_question: str) -> str:
-    question_lower = user_question.lower()
-
-    if "сколько всего видео есть в системе" in question_lower:
-        return "SELECT COUNT(*) FROM videos;"
-
-    return generate_sql_with_ai(user_question)
-
-
-def execute_sql_and_get_number(sql: str) -> int:
-    try:
-        with engine.connect() as conn:
-            result = conn.execute(text(sql))
-            value = result.scalar()
-            return int(value) if value is not None else 0
-    except (SQLAlchemyError, ValueError, TypeError) as e:
-        return 0
-
-
-def ask_question(question: str) -> int:
-    sql = natural_language_to_sql(question)
-    return execute_sql_and_get_number(sql)
-
-
-if __name__ == "__main__":
-    print("Starting NL-to-SQL with Hugging Face API...\n")
-    
-    test_questions = [
-        "Сколько видео получило лайки?",
-        "Сколько видео у креатора с id aca1061a9d324ecf8c3fa2bb32d7be63 набрали больше 10 000 просмотров по итоговой статистике?",
-        "Сколько видео опубликовал креатор с id 8b76e572635b400c9052286a56176e03 в период с 1 ноября 2025 по 5 ноября 2025 включительно?",
-        "Сколько всего есть замеров статистики (по всем видео), в которых число просмотров за час оказалось отрицательным?",
-        "На сколько просмотров суммарно выросли все видео креатора с id cd87be38b50b4fdd8342bb3c383f3c7d в промежутке с 10:00 до 15:00 28 ноября 2025 года?",
-        "Какое суммарное количество просмотров набрали все видео, опубликованные в июне 2025 года?",
-        "Сколько видео набрало больше 100000 просмотров за всё время?",
-        "На сколько просмотров в сумме выросли все видео 28 ноября 2025?",
-        "Сколько разных видео получали новые просмотры 27 ноября 2025?",
-    ]
-    
-    print("Testing AI-generated SQL queries:\n")
-    for question in test_questions:
-        answer = ask_question(question)
-        print(f"Q: {question}")
+import os
+import sys
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import warnings
+import re
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+import logging
+from db import engine, execute_prepared
+from templates import match_template, normalize_question, render_sql
+from cache import TTLCache, backend_from_env
+from columnar import COLUMNAR_PATH, load_or_build
+from llm import LLMError, gateway_from_env
+from metrics import (CACHE_HITS, FALLBACKS, LLM_CALLS, SLOW_QUERIES, SQL_ERRORS, TEMPLATE_HITS,
+                     CallbackCounter, Gauge, slow_query_log, stage)
+from prompt import fixed_prompt, prompt_builder_from_env
+from sql_rewrite import canonical_sql, make_sargable, route_to_rollups
+
+
+warnings.filterwarnings('ignore')
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+
+
+logging.getLogger('sqlalchemy').setLevel(logging.CRITICAL)
+logging.getLogger('httpx').setLevel(logging.CRITICAL)
+logging.getLogger('urllib3').setLevel(logging.CRITICAL)
+
+
+class NullWriter:
+    def write(self, message):
+        pass
+    def flush(self):
+        pass
+
+
+original_stdout = sys.stdout
+original_stderr = sys.stderr
+
+
+sys.stdout = NullWriter()
+sys.stderr = NullWriter()
+sys.stdout = original_stdout
+sys.stderr = original_stderr
+
+
+load_dotenv()
+
+
+# Single-flight, deadline, pool limit and circuit breaker for every model call.
+gateway = gateway_from_env()
+
+Gauge("bot_llm_circuit_open", "1 while the LLM circuit breaker is open (template-only mode)",
+      lambda: int(gateway.breaker.is_open))
+
+# Top-k similar examples plus only the schema and rules the question needs.
+prompt_builder = prompt_builder_from_env()
+
+# Blocking DB and cache calls run here so they never stall the bot's event loop.
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("NL_TO_SQL_WORKERS", "8")),
+    thread_name_prefix="nl_to_sql",
+)
+
+FALLBACK_SQL = "SELECT 0;"
+
+# Normalized question -> SQL, then (data version, canonical SQL) -> number.
+cache_backend = backend_from_env()
+CACHE_BACKEND_RETRY = float(os.getenv("CACHE_BACKEND_RETRY", "30"))
+sql_cache = TTLCache(
+    "sql",
+    maxsize=int(os.getenv("SQL_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("SQL_CACHE_TTL", "3600")),
+    backend=cache_backend,
+    backend_retry=CACHE_BACKEND_RETRY,
+)
+result_cache = TTLCache(
+    "result",
+    maxsize=int(os.getenv("RESULT_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", "300")),
+    backend=cache_backend,
+    backend_retry=CACHE_BACKEND_RETRY,
+)
+USE_ROLLUPS = os.getenv("USE_ROLLUPS", "true").lower() == "true"
+ROLLUP_TABLES = ("rollup_video_daily", "rollup_creator_daily", "rollup_creator_hourly", "rollup_creator_totals")
+_rollups = {"version": None, "installed": False}
+# Per-statement limit for model-written SQL (template SQL is known to be cheap).
+LLM_STATEMENT_TIMEOUT_MS = int(os.getenv("LLM_STATEMENT_TIMEOUT_MS", "2000"))
+# Queries slower than this are logged together with their EXPLAIN plan.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+DATA_VERSION_CHECK_SECONDS = float(os.getenv("DATA_VERSION_CHECK_SECONDS", "5"))
+_data_version = {"value": 0, "checked_at": float("-inf")}
+# Template questions answered from NumPy columns instead of Postgres; the
+# snapshot for the current data version is memory-mapped from COLUMNAR_PATH
+# (written by load_data) or, with COLUMNAR_BUILD, read from the database.
+USE_COLUMNAR = os.getenv("USE_COLUMNAR", "false").lower() == "true"
+COLUMNAR_BUILD = os.getenv("COLUMNAR_BUILD", "true").lower() == "true"
+_columnar = {"store": None, "version": None}
+_columnar_lock = threading.Lock()
+# Run through the template path by warm_up() before the bot reports ready.
+WARMUP_QUESTIONS = (
+    "Сколько всего видео есть в системе?",
+    "Сколько видео набрало больше 1000 просмотров?",
+    "На сколько просмотров в сумме выросли все видео 28 ноября 2025?",
+)
+
+
+def build_prompt(question: str) -> str:
+    if prompt_builder is None:
+        return fixed_prompt(question)
+    return prompt_builder.build(question)
+
+
+def clean_generated_sql(sql: str) -> str:
+    sql = sql.strip()
+    sql = re.sub(r'```sql\s*', '', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\s*```', '', sql)
+    sql = sql.strip()
+
+    if 'SELECT' in sql.upper():
+        select_pos = sql.upper().find('SELECT')
+        sql = sql[select_pos:]
+
+        if ';' in sql:
+            sql = sql[:sql.find(';') + 1]
+        else:
+            sql = sql.split('\n')[0].strip() + ';'
+    else:
+        return FALLBACK_SQL
+
+    timestamp_pattern = r"'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})'"
+    sql = re.sub(timestamp_pattern, r"'\1+00'", sql)
+
+    sql = make_sargable(sql)
+
+    date_pattern = r"'(\d{4}-\d{2}-\d{2})'"
+    sql = re.sub(date_pattern, r"'\1 00:00:00+00'", sql)
+
+    return sql
+
+
+async def generate_sql_with_ai_async(question: str) -> str:
+    """Model-written SQL, or FALLBACK_SQL on errors, deadlines and while the circuit is open."""
+    try:
+        with stage("prompt"):
+            prompt = build_prompt(question)
+        with stage("llm"):
+            completion = await gateway.complete(question_cache_key(question), prompt)
+        with stage("sql_postprocess"):
+            sql = clean_generated_sql(completion)
+    except (LLMError, KeyError, IndexError, TypeError, AttributeError, ValueError) as e:
+        sql = FALLBACK_SQL
+
+    if sql == FALLBACK_SQL:
+        LLM_CALLS.inc(outcome="fallback")
+        FALLBACKS.inc(reason="llm")
+    else:
+        LLM_CALLS.inc(outcome="ok")
+    return sql
+
+
+def generate_sql_with_ai(question: str) -> str:
+    async def generate():
+        try:
+            return await generate_sql_with_ai_async(question)
+        finally:
+            # This loop ends with asyncio.run, so close its upstream session now.
+            await gateway.close()
+
+    return asyncio.run(generate())
+
+
+def question_cache_key(question: str) -> str:
+    return normalize_question(question).rstrip("?!. ")
+
+
+def cached_or_template_query(user_question: str):
+    """(sql, params) from the SQL cache or a template, or None when the model is needed."""
+    with stage("normalize"):
+        key = question_cache_key(user_question)
+    cached = sql_cache.get(key)
+    if cached is not None:
+        CACHE_HITS.inc(cache="sql")
+        if isinstance(cached, str):
+            return cached, None
+        sql, params = cached
+        return sql, params
+
+    with stage("template_match"):
+        match = match_template(user_question)
+    if match is None:
+        return None
+    TEMPLATE_HITS.inc(template=match.name)
+    sql_cache.set(key, [match.sql, match.params])
+    return match.sql, match.params
+
+
+def remember_generated_sql(user_question: str, sql: str):
+    if sql != FALLBACK_SQL:
+        sql_cache.set(question_cache_key(user_question), [sql, None])
+
+
+def question_to_query(user_question: str):
+    """Return (sql, params): template SQL with :name bind parameters, or model SQL and None."""
+    query = cached_or_template_query(user_question)
+    if query is not None:
+        return query
+    sql = generate_sql_with_ai(user_question)
+    remember_generated_sql(user_question, sql)
+    return sql, None
+
+
+def natural_language_to_sql(user_question: str) -> str:
+    return render_sql(*question_to_query(user_question))
+
+
+def current_data_version() -> int:
+    """Data version bumped by load_data; re-read at most every few seconds."""
+    now = time.monotonic()
+    if now - _data_version["checked_at"] < DATA_VERSION_CHECK_SECONDS:
+        return _data_version["value"]
+
+    _data_version["checked_at"] = now
+    try:
+        with engine.connect() as conn:
+            value = conn.execute(
+                text("SELECT value FROM ingest_meta WHERE key = 'data_version'")
+            ).scalar()
+    except SQLAlchemyError:
+        return _data_version["value"]
+
+    version = int(value) if value is not None else 0
+    if version != _data_version["value"]:
+        _data_version["value"] = version
+        result_cache.clear()
+    return version
+
+
+def log_slow_query(conn, sql: str, elapsed_ms: float):
+    SLOW_QUERIES.inc()
+    try:
+        plan = "\n".join(row[0] for row in conn.execute(text("EXPLAIN " + sql)))
+    except SQLAlchemyError as e:
+        plan = f"EXPLAIN failed: {e}"
+    slow_query_log.warning("slow query (%.0f ms): %s\n%s", elapsed_ms, sql, plan)
+
+
+def fetch_number(sql: str, params=None) -> int:
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        if params is not None:
+            value = execute_prepared(conn, sql, params).scalar()
+        else:
+            # Anything not from a template gets a short leash on the pooled connection.
+            if LLM_STATEMENT_TIMEOUT_MS > 0:
+                conn.execute(text(f"SET LOCAL statement_timeout = {LLM_STATEMENT_TIMEOUT_MS}"))
+            value = conn.execute(text(sql)).scalar()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > SLOW_QUERY_MS:
+            log_slow_query(conn, render_sql(sql, params), elapsed_ms)
+        return int(value) if value is not None else 0
+
+
+def current_columnar():
+    """The columnar store for the current data version, or None (Postgres answers)."""
+    if not USE_COLUMNAR:
+        return None
+    version = current_data_version()
+    if _columnar["version"] == version:
+        return _columnar["store"]
+    # One thread (re)loads; the others keep using Postgres meanwhile.
+    if not _columnar_lock.acquire(blocking=False):
+        return None
+    try:
+        try:
+            store = load_or_build(engine, version, COLUMNAR_PATH, build=COLUMNAR_BUILD)
+        except (OSError, ValueError, KeyError, SQLAlchemyError) as e:
+            logging.getLogger(__name__).warning("columnar store unavailable: %s", e)
+            store = None
+        _columnar["store"] = store
+        _columnar["version"] = store.data_version if store is not None else version
+    finally:
+        _columnar_lock.release()
+    return _columnar["store"] if _columnar["version"] == version else None
+
+
+def rollups_installed() -> bool:
+    """Whether the rollup tables exist; checked again when the data version changes."""
+    version = current_data_version()
+    if _rollups["version"] != version:
+        checks = " AND ".join(f"to_regclass('{name}') IS NOT NULL" for name in ROLLUP_TABLES)
+        try:
+            with engine.connect() as conn:
+                installed = bool(conn.execute(text(f"SELECT {checks}")).scalar())
+        except SQLAlchemyError:
+            return False
+        _rollups.update(version=version, installed=installed)
+    return _rollups["installed"]
+
+
+def run_query(sql: str, params=None) -> int:
+    """Answer from the columnar store or the rollup tables when the query allows it, else as written."""
+    store = current_columnar() if params is not None else None
+    if store is not None:
+        with stage("columnar"):
+            value = store.answer(sql, params)
+        if value is not None:
+            return value
+
+    # Routed on the parameterised SQL, so template queries stay prepared statements.
+    routed = route_to_rollups(sql, params) if USE_ROLLUPS else None
+    if routed is not None and not rollups_installed():
+        routed = None
+    with stage("db"):
+        if routed is not None:
+            try:
+                return fetch_number(*routed)
+            except SQLAlchemyError:
+                SQL_ERRORS.inc(query="rollup")
+        return fetch_number(sql, params)
+
+
+def execute_sql_and_get_number(sql: str, params=None) -> int:
+    key = f"{current_data_version()}:{canonical_sql(render_sql(sql, params))}"
+    cached = result_cache.get(key)
+    if cached is not None:
+        CACHE_HITS.inc(cache="result")
+        return cached
+
+    try:
+        value = run_query(sql, params)
+    except (SQLAlchemyError, ValueError, TypeError) as e:
+        SQL_ERRORS.inc(query="question")
+        FALLBACKS.inc(reason="sql_error")
+        return 0
+
+    result_cache.set(key, value)
+    return value
+
+
+def cache_stats() -> dict:
+    return {"sql": sql_cache.stats(), "result": result_cache.stats(), "llm": gateway.stats()}
+
+
+def _cache_events() -> dict:
+    return {(name, event): value
+            for name, cache in (("sql", sql_cache), ("result", result_cache))
+            for event, value in cache.stats().items() if event != "size"}
+
+
+CallbackCounter("bot_cache_events_total", "SQL and result cache hits, misses, evictions and backend errors",
+                _cache_events, ("cache", "event"))
+Gauge("bot_cache_entries", "Entries held in the in-process SQL and result caches",
+      lambda: {("sql",): sql_cache.stats()["size"], ("result",): result_cache.stats()["size"]}, ("cache",))
+
+
+def ask_question(question: str) -> int:
+    sql, params = question_to_query(question)
+    return execute_sql_and_get_number(sql, params)
+
+
+def warm_up():
+    """Check the database and answer a few template questions so the first real one is not cold.
+
+    Raises SQLAlchemyError while the database is unreachable.
+    """
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    current_data_version()
+    current_columnar()
+    for question in WARMUP_QUESTIONS:
+        match = match_template(question)
+        run_query(match.sql, match.params)
+
+
+async def warm_up_async() -> bool:
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(executor, warm_up)
+    except SQLAlchemyError as e:
+        print(f"Warm-up failed: {e}")
+        return False
+    return True
+
+
+async def question_to_query_async(user_question: str):
+    loop = asyncio.get_running_loop()
+    query = await loop.run_in_executor(executor, cached_or_template_query, user_question)
+    if query is not None:
+        return query
+    sql = await generate_sql_with_ai_async(user_question)
+    await loop.run_in_executor(executor, remember_generated_sql, user_question, sql)
+    return sql, None
+
+
+async def natural_language_to_sql_async(user_question: str) -> str:
+    return render_sql(*await question_to_query_async(user_question))
+
+
+async def execute_sql_and_get_number_async(sql: str, params=None) -> int:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, execute_sql_and_get_number, sql, params)
+
+
+async def ask_question_async(question: str) -> int:
+    sql, params = await question_to_query_async(question)
+    return await execute_sql_and_get_number_async(sql, params)
+
+
+if __name__ == "__main__":
+    print("Starting NL-to-SQL with Hugging Face API...\n")
+    
+    test_questions = [
+        "Сколько видео получило лайки?",
+        "Сколько видео у креатора с id aca1061a9d324ecf8c3fa2bb32d7be63 набрали больше 10 000 просмотров по итоговой статистике?",
+        "Сколько видео опубликовал креатор с id 8b76e572635b400c9052286a56176e03 в период с 1 ноября 2025 по 5 ноября 2025 включительно?",
+        "Сколько всего есть замеров статистики (по всем видео), в которых число просмотров за час оказалось отрицательным?",
+        "На сколько просмотров суммарно выросли все видео креатора с id cd87be38b50b4fdd8342bb3c383f3c7d в промежутке с 10:00 до 15:00 28 ноября 2025 года?",
+        "Какое суммарное количество просмотров набрали все видео, опубликованные в июне 2025 года?",
+        "Сколько видео набрало больше 100000 просмотров за всё время?",
+        "На сколько просмотров в сумме выросли все видео 28 ноября 2025?",
+        "Сколько разных видео получали новые просмотры 27 ноября 2025?",
+    ]
+    
+    print("Testing AI-generated SQL queries:\n")
+    for question in test_questions:
+        answer = ask_question(question)
+        print(f"Q: {question}")
         print(f"A: {answer}\n")
\ No newline at end of file
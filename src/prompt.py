@@ -0,0 +1,242 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from templates import normalize_question
+
+
+@dataclass(frozen=True)
+class Example:
+    question: str
+    sql: str
+
+
+# Only questions that no template answers: the model never sees the others.
+EXAMPLES = (
+    Example("Сколько видео получило и лайки, и комментарии?",
+            "SELECT COUNT(*) FROM videos WHERE likes_count > 0 AND comments_count > 0;"),
+    Example("Сколько видео набрали от 1000 до 10000 просмотров?",
+            "SELECT COUNT(*) FROM videos WHERE views_count >= 1000 AND views_count <= 10000;"),
+    Example("Сколько видео у креатора с id X набрали больше 10000 просмотров в ноябре 2025?",
+            "SELECT COUNT(*) FROM videos WHERE creator_id = 'X' AND views_count > 10000 AND video_created_at >= '2025-11-01 00:00:00+00' AND video_created_at < '2025-12-01 00:00:00+00';"),
+    Example("Сколько видео опубликовали креаторы с id X и с id Y в период с 1 по 5 ноября 2025?",
+            "SELECT COUNT(*) FROM videos WHERE creator_id IN ('X', 'Y') AND video_created_at >= '2025-11-01 00:00:00+00' AND video_created_at < '2025-11-06 00:00:00+00';"),
+    Example("Сколько замеров статистики было сделано 28 ноября 2025?",
+            "SELECT COUNT(*) FROM video_snapshots WHERE created_at >= '2025-11-28 00:00:00+00' AND created_at < '2025-11-29 00:00:00+00';"),
+    Example("Сколько у креатора с id X замеров с отрицательным приростом просмотров?",
+            "SELECT COUNT(*) FROM video_snapshots vs JOIN videos v ON vs.video_id = v.id WHERE v.creator_id = 'X' AND vs.delta_views_count < 0;"),
+    Example("Какое суммарное количество просмотров набрали видео креатора с id X, опубликованные в июне 2025 года?",
+            "SELECT COALESCE(SUM(views_count), 0) FROM videos WHERE creator_id = 'X' AND video_created_at >= '2025-06-01 00:00:00+00' AND video_created_at < '2025-07-01 00:00:00+00';"),
+    Example("Сколько разных креаторов опубликовали видео с >100000 просмотров в ноябре 2025?",
+            "SELECT COUNT(DISTINCT creator_id) FROM videos WHERE views_count > 100000 AND video_created_at >= '2025-11-01 00:00:00+00' AND video_created_at < '2025-12-01 00:00:00+00';"),
+    Example("В скольких разных календарных днях ноября 2025 года публиковалось хотя бы одно видео?",
+            "SELECT COUNT(DISTINCT DATE(video_created_at)) FROM videos WHERE video_created_at >= '2025-11-01 00:00:00+00' AND video_created_at < '2025-12-01 00:00:00+00';"),
+    Example("На сколько лайков выросли все видео 28 ноября 2025, не считая отрицательных замеров?",
+            "SELECT COALESCE(SUM(delta_likes_count), 0) FROM video_snapshots WHERE created_at >= '2025-11-28 00:00:00+00' AND created_at < '2025-11-29 00:00:00+00' AND delta_likes_count > 0;"),
+    Example("Сколько разных креаторов получили новые просмотры 27 ноября 2025?",
+            "SELECT COUNT(DISTINCT v.creator_id) FROM video_snapshots vs JOIN videos v ON vs.video_id = v.id WHERE vs.created_at >= '2025-11-27 00:00:00+00' AND vs.created_at < '2025-11-28 00:00:00+00' AND vs.delta_views_count > 0;"),
+    Example("Сколько всего креаторов в системе?",
+            "SELECT COUNT(DISTINCT creator_id) FROM videos;"),
+    Example("Сколько видео у креатора с id X получили хотя бы одну жалобу?",
+            "SELECT COUNT(*) FROM videos WHERE creator_id = 'X' AND reports_count > 0;"),
+    Example("Какое среднее количество просмотров у видео креатора с id X?",
+            "SELECT COALESCE(ROUND(AVG(views_count)), 0) FROM videos WHERE creator_id = 'X';"),
+    Example("Какое максимальное число лайков у одного видео?",
+            "SELECT COALESCE(MAX(likes_count), 0) FROM videos;"),
+    Example("Сколько креаторов опубликовали больше 10 видео?",
+            "SELECT COUNT(*) FROM (SELECT creator_id FROM videos GROUP BY creator_id HAVING COUNT(*) > 10) t;"),
+    Example("Сколько видео без единого комментария?",
+            "SELECT COUNT(*) FROM videos WHERE comments_count = 0;"),
+    Example("Сколько видео набрали больше 1000 лайков и меньше 10 комментариев?",
+            "SELECT COUNT(*) FROM videos WHERE likes_count > 1000 AND comments_count < 10;"),
+    Example("Какой максимальный прирост просмотров за час был у одного видео?",
+            "SELECT COALESCE(MAX(delta_views_count), 0) FROM video_snapshots;"),
+    Example("На сколько уменьшилось число лайков суммарно за 26 ноября 2025?",
+            "SELECT COALESCE(-SUM(delta_likes_count), 0) FROM video_snapshots WHERE created_at >= '2025-11-26 00:00:00+00' AND created_at < '2025-11-27 00:00:00+00' AND delta_likes_count < 0;"),
+    Example("Сколько замеров статистики было сделано для видео креатора с id X?",
+            "SELECT COUNT(*) FROM video_snapshots vs JOIN videos v ON vs.video_id = v.id WHERE v.creator_id = 'X';"),
+    Example("Сколько жалоб суммарно получили видео, опубликованные в 2025 году?",
+            "SELECT COALESCE(SUM(reports_count), 0) FROM videos WHERE video_created_at >= '2025-01-01 00:00:00+00' AND video_created_at < '2026-01-01 00:00:00+00';"),
+    Example("Сколько разных креаторов публиковали видео в октябре 2025?",
+            "SELECT COUNT(DISTINCT creator_id) FROM videos WHERE video_created_at >= '2025-10-01 00:00:00+00' AND video_created_at < '2025-11-01 00:00:00+00';"),
+)
+
+SCHEMA = {
+    "videos": "videos(id, creator_id, video_created_at, views_count, likes_count, comments_count, reports_count)",
+    "video_snapshots": "video_snapshots(id, video_id, created_at, delta_views_count, delta_likes_count, delta_comments_count, delta_reports_count)",
+}
+
+# (rule, pattern over the normalized question or None for always)
+RULES = (
+    ('Для итоговой статистики ("набрали", "получили", "итого", "всего", "опубликовал") используй таблицу videos', None),
+    ('Для изменений ("выросли", "получили новые", "изменилось", "за период") используй таблицу video_snapshots', None),
+    ('Для "разных/уникальных" используй DISTINCT', r"разн|уникальн|различн"),
+    ('Для "суммарно", "всего", "общее количество" используй SUM с COALESCE', r"сумм|всего|общ"),
+    ("Все timestamp должны заканчиваться на '+00'", None),
+    ("JOIN нужен ТОЛЬКО если нужно связать video_snapshots с videos по creator_id", r"креатор"),
+    ("Не добавляй фильтры по дате если их нет в вопросе", None),
+    ("Для подсчета РАЗНЫХ КАЛЕНДАРНЫХ ДНЕЙ используй COUNT(DISTINCT DATE(column))", r"дн(ях|ей|и)\b"),
+    ("Фильтруй даты только диапазоном column >= 'начало' AND column < 'конец', без EXTRACT и DATE() в WHERE",
+     r"\d{4}|январ|феврал|март|апрел|ма[йя]|июн|июл|август|сентябр|октябр|ноябр|декабр|\d:\d\d"),
+)
+
+# Words that point at one table when no retrieved example settles it.
+TABLE_HINTS = {
+    "videos": r"набрал|опубликов|публиков|итогов|всего видео|креатор",
+    "video_snapshots": r"вырос|прирост|измен|замер|за час|новые|уменьш",
+}
+
+HEADER = "Ты SQL эксперт. Создай SQL запрос для PostgreSQL."
+FOOTER = "SQL (только SQL):\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 3 characters per token for mixed Russian and SQL)."""
+    return len(text) // 3 + 1
+
+
+def _masked(question: str) -> str:
+    # Ids and numbers vary between otherwise identical questions.
+    text = normalize_question(question)
+    text = re.sub(r"\b[0-9a-f]{16,}\b", "id", text, flags=re.IGNORECASE)
+    return re.sub(r"\d+", "0", text)
+
+
+def _ngrams(text: str, sizes=(3, 4, 5)) -> Counter:
+    padded = f" {text} "
+    return Counter(padded[i:i + n] for n in sizes for i in range(len(padded) - n + 1))
+
+
+class ExampleIndex:
+    """Character n-gram TF-IDF index over example questions, searched by cosine similarity."""
+
+    def __init__(self, examples):
+        self.examples = list(examples)
+        grams = [_ngrams(_masked(example.question)) for example in self.examples]
+        document_frequency = Counter(gram for counts in grams for gram in counts)
+        total = len(self.examples)
+        self.idf = {gram: math.log((1 + total) / (1 + df)) + 1 for gram, df in document_frequency.items()}
+        self.vectors = [self._vector(counts) for counts in grams]
+
+    def _vector(self, counts: Counter) -> dict:
+        vector = {gram: (1 + math.log(tf)) * self.idf[gram] for gram, tf in counts.items() if gram in self.idf}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {gram: weight / norm for gram, weight in vector.items()}
+
+    def search(self, question: str, k: int):
+        """Return up to k (score, example) pairs, most similar first."""
+        query = self._vector(_ngrams(_masked(question)))
+        scored = []
+        for example, vector in zip(self.examples, self.vectors):
+            if len(vector) < len(query):
+                score = sum(weight * query.get(gram, 0.0) for gram, weight in vector.items())
+            else:
+                score = sum(weight * vector.get(gram, 0.0) for gram, weight in query.items())
+            scored.append((score, example))
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return [pair for pair in scored[:k] if pair[0] > 0]
+
+
+def load_examples(path: str):
+    """Extra examples from a JSON Lines file of {"question": ..., "sql": ...} objects."""
+    with open(path, encoding="utf-8") as f:
+        return [Example(item["question"], item["sql"]) for item in map(json.loads, f) if item]
+
+
+class PromptBuilder:
+    """Builds a prompt from the top-k similar examples and only the schema and rules they need.
+
+    Examples are dropped, least similar first, until the prompt fits in
+    ``token_budget`` estimated tokens.
+    """
+
+    def __init__(self, examples=EXAMPLES, top_k: int = 4, token_budget: int = 600):
+        self.index = ExampleIndex(examples)
+        self.top_k = top_k
+        self.token_budget = token_budget
+
+    def tables_for(self, question: str, examples) -> list:
+        text = normalize_question(question)
+        tables = {name for name in SCHEMA if any(re.search(rf"\b{name}\b", example.sql) for example in examples)}
+        tables |= {name for name, pattern in TABLE_HINTS.items() if re.search(pattern, text)}
+        return [name for name in SCHEMA if name in tables] or list(SCHEMA)
+
+    def rules_for(self, question: str, tables) -> list:
+        text = normalize_question(question)
+        rules = [rule for rule, pattern in RULES if pattern is None or re.search(pattern, text)]
+        if len(tables) < len(SCHEMA):
+            # The table choice is already made; the rules for choosing or joining tables are noise.
+            rules = [rule for rule in rules[2:] if "JOIN" not in rule]
+        return rules
+
+    def render(self, question: str, examples) -> str:
+        tables = self.tables_for(question, examples)
+        rules = self.rules_for(question, tables)
+        parts = [HEADER, f'ВОПРОС: "{question}"',
+                 "СХЕМА:\n" + "\n".join(f"{i}. {SCHEMA[name]}" for i, name in enumerate(tables, 1)),
+                 "ПРАВИЛА:\n" + "\n".join(f"{i}. {rule}" for i, rule in enumerate(rules, 1))]
+        if examples:
+            parts.append("ПРИМЕРЫ:\n" + "\n".join(
+                f'{i}. "{example.question}" → {example.sql}' for i, example in enumerate(examples, 1)))
+        parts.append(FOOTER)
+        return "\n\n".join(parts)
+
+    def build(self, question: str) -> str:
+        examples = [example for _, example in self.index.search(question, self.top_k)]
+        prompt = self.render(question, examples)
+        while examples and estimate_tokens(prompt) > self.token_budget:
+            examples.pop()
+            prompt = self.render(question, examples)
+        return prompt
+
+
+def fixed_prompt(question: str) -> str:
+    """The baseline prompt, verbatim: full schema, every rule and nine fixed examples."""
+    return f"""Ты SQL эксперт. Создай SQL запрос для PostgreSQL.
+
+ВОПРОС: "{question}"
+
+СХЕМА:
+1. videos(id, creator_id, video_created_at, views_count, likes_count, comments_count, reports_count)
+2. video_snapshots(id, video_id, created_at, delta_views_count, delta_likes_count, delta_comments_count, delta_reports_count)
+
+ПРАВИЛА:
+1. Для итоговой статистики ("набрали", "получили", "итого", "всего", "опубликовал") используй таблицу videos
+2. Для изменений ("выросли", "получили новые", "изменилось", "за период") используй таблицу video_snapshots
+3. Для "разных/уникальных" используй DISTINCT
+4. Для "суммарно", "всего", "общее количество" используй SUM с COALESCE
+5. Все timestamp должны заканчиваться на '+00'
+6. JOIN нужен ТОЛЬКО если нужно связать video_snapshots с videos по creator_id
+7. Не добавляй фильтры по дате если их нет в вопросе
+8. Для подсчета РАЗНЫХ КАЛЕНДАРНЫХ ДНЕЙ в месяце используй COUNT(DISTINCT EXTRACT(DAY FROM column))
+
+ВАЖНЫЕ ПРИМЕРЫ:
+1. "Сколько видео получило лайки?" → SELECT COUNT(*) FROM videos WHERE likes_count > 0;
+2. "Сколько видео набрали больше 10000 просмотров?" → SELECT COUNT(*) FROM videos WHERE views_count > 10000;
+3. "Сколько видео у креатора с id X набрали больше 10000 просмотров?" → SELECT COUNT(*) FROM videos WHERE creator_id = 'X' AND views_count > 10000;
+4. "Сколько видео опубликовал креатор с id Y в период с 1 по 5 ноября 2025?" → SELECT COUNT(*) FROM videos WHERE creator_id = 'Y' AND video_created_at >= '2025-11-01 00:00:00+00' AND video_created_at <= '2025-11-05 23:59:59+00';
+5. "Сколько всего есть замеров статистики, в которых число просмотров за час оказалось отрицательным?" → SELECT COUNT(*) FROM video_snapshots WHERE delta_views_count < 0;
+6. "На сколько просмотров суммарно выросли все видео креатора с id X в промежутке с 10:00 до 15:00 28 ноября 2025 года?" → SELECT COALESCE(SUM(vs.delta_views_count), 0) FROM video_snapshots vs JOIN videos v ON vs.video_id = v.id WHERE v.creator_id = 'X' AND vs.created_at >= '2025-11-28 10:00:00+00' AND vs.created_at <= '2025-11-28 15:00:00+00';
+7. "Какое суммарное количество просмотров набрали все видео, опубликованные в июне 2025 года?" → SELECT COALESCE(SUM(views_count), 0) FROM videos WHERE EXTRACT(YEAR FROM video_created_at) = 2025 AND EXTRACT(MONTH FROM video_created_at) = 6;
+8. "Сколько разных креаторов имеют хотя бы одно видео с >100000 просмотров?" → SELECT COUNT(DISTINCT creator_id) FROM videos WHERE views_count > 100000;
+9. "В скольких разных календарных днях ноября 2025 года креатор публиковал хотя бы одно видео?" → SELECT COUNT(DISTINCT EXTRACT(DAY FROM video_created_at)) FROM videos WHERE creator_id = 'ID' AND EXTRACT(YEAR FROM video_created_at) = 2025 AND EXTRACT(MONTH FROM video_created_at) = 11;
+
+SQL (только SQL):
+"""
+
+
+def prompt_builder_from_env():
+    """PromptBuilder from PROMPT_* settings, or None for PROMPT_MODE=fixed."""
+    if os.getenv("PROMPT_MODE", "retrieval").lower() == "fixed":
+        return None
+    examples = list(EXAMPLES)
+    path = os.getenv("PROMPT_EXAMPLES_PATH")
+    if path:
+        examples += load_examples(path)
+    return PromptBuilder(
+        examples,
+        top_k=int(os.getenv("PROMPT_TOP_K", "4")),
+        token_budget=int(os.getenv("PROMPT_TOKEN_BUDGET", "600")),
+    )
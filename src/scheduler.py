@@ -0,0 +1,111 @@
+import asyncio
+import os
+from collections import deque
+
+
+class QuestionScheduler:
+    """Bounded worker pool that runs question jobs with per-chat fairness.
+
+    Jobs are queued per chat and workers take chats in round-robin order,
+    so one chat flooding the bot cannot starve the others. A chat has at
+    most one job running at a time, so its answers come back in the order
+    its questions arrived. ``submit`` returns False when the global queue
+    or the chat's own queue is full.
+    """
+
+    def __init__(self, handler, max_concurrency: int = 8, max_queue: int = 1000,
+                 max_per_chat: int = 10):
+        self.handler = handler
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_per_chat = max_per_chat
+        self._queues = {}
+        self._ready = deque()
+        self._pending = 0
+        self._active = 0
+        self._wakeup = None
+        self._workers = []
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def submit(self, chat_id, job) -> bool:
+        if self._pending >= self.max_queue:
+            return False
+
+        # A chat keeps its queue while a job of it runs; _release puts it
+        # back in the ready line once that job is done.
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = deque()
+            self._ready.append(chat_id)
+        elif len(queue) >= self.max_per_chat:
+            return False
+
+        queue.append(job)
+        self._pending += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def _next_job(self):
+        chat_id = self._ready.popleft()
+        job = self._queues[chat_id].popleft()
+        self._pending -= 1
+        return chat_id, job
+
+    def _release(self, chat_id):
+        if self._queues[chat_id]:
+            self._ready.append(chat_id)
+            self._wakeup.set()
+        else:
+            del self._queues[chat_id]
+
+    async def _worker(self):
+        while True:
+            if not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            chat_id, job = self._next_job()
+            self._active += 1
+            try:
+                await self.handler(job)
+            except Exception as e:
+                print(f"Error in scheduler worker: {e}")
+            finally:
+                self._active -= 1
+                self._release(chat_id)
+
+    async def start(self):
+        if self._workers:
+            return
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.max_concurrency)
+        ]
+
+    async def drain(self, timeout: float):
+        """Wait up to ``timeout`` seconds for queued and running jobs to finish."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (self._pending or self._active) and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+def scheduler_from_env(handler) -> QuestionScheduler:
+    return QuestionScheduler(
+        handler,
+        max_concurrency=int(os.getenv("BOT_MAX_CONCURRENCY", "8")),
+        max_queue=int(os.getenv("BOT_MAX_QUEUE", "1000")),
+        max_per_chat=int(os.getenv("BOT_MAX_PER_CHAT", "10")),
+    )
@@ -0,0 +1,185 @@
+import re
+from datetime import date, datetime, timedelta
+
+
+METRIC = r"(?P<metric>views|likes|comments|reports)"
+# Literal values (model SQL) or :name bind parameters (template SQL).
+CREATOR = r"(?:'(?P<creator>[0-9A-Za-z_-]+)'|:(?P<creator_param>\w+))"
+
+
+def _bound(name: str) -> str:
+    return (rf"(?:'(?P<{name}>\d{{4}}-\d{{2}}-\d{{2}} \d{{2}}:\d{{2}}:\d{{2}})\+00'"
+            rf"|:(?P<{name}_param>\w+))")
+
+
+START, END = _bound("start"), _bound("end")
+
+
+def canonical_sql(sql: str) -> str:
+    return re.sub(r"\s+", " ", sql).strip().rstrip(";").strip()
+
+
+COLUMN = r"(?P<column>(?:\w+\.)?\w+)"
+
+
+def _ts(day: date) -> str:
+    return f"'{day.isoformat()} 00:00:00+00'"
+
+
+def _range(column: str, start: date, end: date) -> str:
+    return f"{column} >= {_ts(start)} AND {column} < {_ts(end)}"
+
+
+def _next_month(year: int, month: int) -> date:
+    return date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+
+
+def _year_month(m):
+    year, month = int(m.group("year")), int(m.group("month"))
+    return _range(m.group("column"), date(year, month, 1), _next_month(year, month))
+
+
+def _year(m):
+    year = int(m.group("year"))
+    return _range(m.group("column"), date(year, 1, 1), date(year + 1, 1, 1))
+
+
+def _day(m):
+    day = date.fromisoformat(m.group("day"))
+    return _range(m.group("column"), day, day + timedelta(days=1))
+
+
+def _end_of_day(m):
+    day = date.fromisoformat(m.group("day"))
+    return f"{m.group('column')} < {_ts(day + timedelta(days=1))}"
+
+
+# Predicates that wrap the column in a function (and so cannot use its
+# index) rewritten into half-open timestamp ranges with literal bounds.
+SARGABLE_REWRITES = (
+    (re.compile(rf"EXTRACT\(\s*YEAR\s+FROM\s+{COLUMN}\s*\)\s*=\s*(?P<year>\d{{4}})(?!\d)\s+AND\s+"
+                rf"EXTRACT\(\s*MONTH\s+FROM\s+(?P=column)\s*\)\s*=\s*(?P<month>\d{{1,2}})(?!\d)", re.IGNORECASE),
+     _year_month),
+    (re.compile(rf"EXTRACT\(\s*MONTH\s+FROM\s+{COLUMN}\s*\)\s*=\s*(?P<month>\d{{1,2}})(?!\d)\s+AND\s+"
+                rf"EXTRACT\(\s*YEAR\s+FROM\s+(?P=column)\s*\)\s*=\s*(?P<year>\d{{4}})(?!\d)", re.IGNORECASE),
+     _year_month),
+    (re.compile(rf"EXTRACT\(\s*YEAR\s+FROM\s+{COLUMN}\s*\)\s*=\s*(?P<year>\d{{4}})(?!\d)", re.IGNORECASE),
+     _year),
+    (re.compile(rf"DATE\(\s*{COLUMN}\s*\)\s*=\s*'(?P<day>\d{{4}}-\d{{2}}-\d{{2}})'", re.IGNORECASE),
+     _day),
+    (re.compile(rf"{COLUMN}::date\s*=\s*'(?P<day>\d{{4}}-\d{{2}}-\d{{2}})'", re.IGNORECASE),
+     _day),
+    (re.compile(rf"{COLUMN}\s*<=\s*'(?P<day>\d{{4}}-\d{{2}}-\d{{2}}) 23:59:59(?:\+00)?'", re.IGNORECASE),
+     _end_of_day),
+)
+
+
+def _substitute(pattern, build, sql: str) -> str:
+    def replace(m):
+        try:
+            replacement = build(m)
+        except ValueError:
+            # Not a real date (month 13, '2025-11-31'): leave it for Postgres to reject.
+            return m.group(0)
+        # Keep "NOT <predicate>" meaning the same once it becomes two terms.
+        if " AND " in replacement and re.search(r"\bNOT\s*$", sql[:m.start()], re.IGNORECASE):
+            return f"({replacement})"
+        return replacement
+    return pattern.sub(replace, sql)
+
+
+def make_sargable(sql: str) -> str:
+    for pattern, build in SARGABLE_REWRITES:
+        sql = _substitute(pattern, build, sql)
+    return sql
+
+
+def _value(m, name: str, params):
+    """A matched literal, or the value of the matched bind parameter."""
+    if m.group(name) is not None:
+        return m.group(name)
+    return (params or {}).get(m.group(f"{name}_param"))
+
+
+def _bucket(start: str, end: str):
+    """Return ("day"|"hour", start, end) when both bounds sit on a bucket edge"""
+    try:
+        start_ts = datetime.fromisoformat(str(start).removesuffix("+00"))
+        end_ts = datetime.fromisoformat(str(end).removesuffix("+00"))
+    except ValueError:
+        return None
+    if start_ts.minute or start_ts.second or end_ts.minute or end_ts.second:
+        return None
+    if start_ts.hour == 0 and end_ts.hour == 0:
+        return "day", start_ts.date().isoformat(), end_ts.date().isoformat()
+    return "hour", f"{start_ts.isoformat(' ')}+00", f"{end_ts.isoformat(' ')}+00"
+
+
+def _route_growth(m, params, creator=False):
+    bucket = _bucket(_value(m, "start", params), _value(m, "end", params))
+    if bucket is None:
+        return None
+    column, start, end = bucket
+    table = "rollup_creator_daily" if column == "day" else "rollup_creator_hourly"
+    routed_params = {"start": start, "end": end}
+    creator_filter = ""
+    if creator:
+        routed_params["creator_id"] = _value(m, "creator", params)
+        creator_filter = "creator_id = :creator_id AND "
+    return (f"SELECT COALESCE(SUM(delta_{m.group('metric')}_count), 0) FROM {table} "
+            f"WHERE {creator_filter}{column} >= :start AND {column} < :end;", routed_params)
+
+
+def _route_distinct_growth(m, params):
+    bucket = _bucket(_value(m, "start", params), _value(m, "end", params))
+    if bucket is None or bucket[0] != "day":
+        return None
+    _, start, end = bucket
+    return (f"SELECT COUNT(DISTINCT video_id) FROM rollup_video_daily "
+            f"WHERE day >= :start AND day < :end AND positive_{m.group('metric')}_snapshots > 0;",
+            {"start": start, "end": end})
+
+
+# (pattern over canonical SQL, builder returning (rollup SQL, params) or None)
+ROLLUP_ROUTES = (
+    (re.compile(
+        rf"SELECT COALESCE\(SUM\(delta_{METRIC}_count\), 0\) FROM video_snapshots "
+        rf"WHERE created_at >= {START} AND created_at < {END}",
+        re.IGNORECASE),
+     _route_growth),
+    (re.compile(
+        rf"SELECT COALESCE\(SUM\(vs\.delta_{METRIC}_count\), 0\) "
+        rf"FROM video_snapshots vs JOIN videos v ON vs\.video_id = v\.id "
+        rf"WHERE v\.creator_id = {CREATOR} AND vs\.created_at >= {START} AND vs\.created_at < {END}",
+        re.IGNORECASE),
+     lambda m, params: _route_growth(m, params, creator=True)),
+    (re.compile(
+        rf"SELECT COUNT\(DISTINCT video_id\) FROM video_snapshots "
+        rf"WHERE created_at >= {START} AND created_at < {END} AND delta_{METRIC}_count > 0",
+        re.IGNORECASE),
+     _route_distinct_growth),
+    (re.compile(rf"SELECT COUNT\(\*\) FROM video_snapshots WHERE delta_{METRIC}_count < 0", re.IGNORECASE),
+     lambda m, params: (f"SELECT COALESCE(SUM(negative_{m.group('metric')}_snapshots), 0) "
+                        f"FROM rollup_video_daily;", {})),
+    (re.compile(rf"SELECT COUNT\(\*\) FROM videos WHERE creator_id = {CREATOR}", re.IGNORECASE),
+     lambda m, params: ("SELECT COALESCE(SUM(video_count), 0) FROM rollup_creator_totals "
+                        "WHERE creator_id = :creator_id;", {"creator_id": _value(m, "creator", params)})),
+    (re.compile(r"SELECT COUNT\(\*\) FROM videos", re.IGNORECASE),
+     lambda m, params: ("SELECT COALESCE(SUM(video_count), 0) FROM rollup_creator_totals;", {})),
+)
+
+
+def route_to_rollups(sql: str, params: dict = None):
+    """Rewrite a query onto the rollup tables when it has a known shape.
+
+    ``sql`` may carry literal values or :name bind parameters (with their
+    values in ``params``). Returns (rollup SQL with :name bind parameters,
+    params), or None when the query is not eligible (other shapes, or time
+    bounds that do not sit on whole UTC hours/days).
+    """
+    canonical = canonical_sql(sql)
+    for pattern, build in ROLLUP_ROUTES:
+        m = pattern.fullmatch(canonical)
+        if m:
+            return build(m, params)
+    return None
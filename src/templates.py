@@ -0,0 +1,334 @@
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+
+MONTHS = {
+    "январ": 1, "феврал": 2, "март": 3, "апрел": 4, "ма": 5, "июн": 6,
+    "июл": 7, "август": 8, "сентябр": 9, "октябр": 10, "ноябр": 11, "декабр": 12,
+}
+MONTH = r"(?:январ|феврал|март|апрел|июн|июл|август|сентябр|октябр|ноябр|декабр)[а-я]*|ма[йяе]\b"
+
+METRICS = {
+    "просмотр": "views",
+    "лайк": "likes",
+    "комментари": "comments",
+    "жалоб": "reports",
+}
+
+COMPARISONS = {
+    "не менее": ">=", "не более": "<=", "не больше": "<=", "не меньше": ">=",
+    "больше": ">", "более": ">", "свыше": ">", "выше": ">", ">": ">",
+    "меньше": "<", "менее": "<", "ниже": "<", "<": "<",
+}
+
+# One alternation that recognises every slot and intent keyword. Order
+# matters: longer constructs (ranges) must win over their parts (dates).
+# "unsupported" catches modifiers no template can express (negation,
+# exclusion, open or relative periods, bare years and months, rates); it
+# only sees the text the slot patterns before it did not consume.
+TOKEN_PATTERN = re.compile("|".join([
+    r"(?P<creator>\bкреатор[а-я]*\s+(?:с\s+)?(?i:id)\s*:?\s*(?P<creator_id>[0-9A-Za-z_-]+))",
+    r"(?P<bare_id>\b(?i:id)\s*:?\s*[0-9A-Za-z_-]+)",
+    r"(?P<hours>\bс\s+(?P<h_from>\d{1,2})[:.](?P<m_from>\d{2})\s+(?:до|по)\s+(?P<h_to>\d{1,2})[:.](?P<m_to>\d{2}))",
+    r"(?P<range>\b(?:с|от)\s+(?P<r_day1>\d{1,2})(?:\s+(?P<r_month1>" + MONTH + r"))?(?:\s+(?P<r_year1>\d{4}))?(?:\s+года)?"
+    r"\s+(?:по|до)\s+(?P<r_day2>\d{1,2})\s+(?P<r_month2>" + MONTH + r")(?:\s+(?P<r_year2>\d{4}))?)",
+    r"(?P<date>\b(?P<d_day>\d{1,2})\s+(?P<d_month>" + MONTH + r")(?:\s+(?P<d_year>\d{4}))?)",
+    r"(?P<month>\b(?P<m_month>" + MONTH + r")\s+(?P<m_year>\d{4}))",
+    r"(?P<threshold>(?P<cmp>не\s+менее|не\s+более|не\s+больше|не\s+меньше|больше|более|свыше|выше|меньше|менее|ниже|[<>])\s*(?:чем\s+)?(?P<number>\d+))",
+    r"(?P<metric>\b(?P<metric_stem>просмотр|лайк|комментари|жалоб))",
+    r"(?P<unsupported>\b(?:средн|максимальн|минимальн|сам[а-я]+|какой|какие|топ|процент|медиан"
+    r"|уменьш|снизил|сократил|упал|падени|потерял"
+    r"|не\b(?!\s+(?:менее|более|больше|меньше)\b)|без\b|ни\b|кроме\b|за\s+исключением|исключая"
+    r"|после\b|до\b|(?:с|от)\s+\d{1,2}\s+(?:" + MONTH + r")"
+    r"|(?:19|20)\d{2}\b|вчера|сегодня|позавчера|недел|последн|прошл|текущ"
+    r"|(?:" + MONTH + r")|в\s+(?:час|день|сутки|минуту)\b))",
+    r"(?P<creators>\bкреаторов\b)",
+    r"(?P<snapshots>\bзамер)",
+    r"(?P<negative>\bотрицательн)",
+    r"(?P<days>\bкалендарн[а-я]*\s+дн)",
+    r"(?P<growth>\bвырос|\bприрост|\bприбавил|\bновые)",
+    r"(?P<howmuch>\bна\s+сколько\b)",
+    r"(?P<distinct>\bразн|\bразличн|\bуникальн)",
+    r"(?P<sum>\bсуммарн|\bв\s+сумме|\bсумм)",
+    r"(?P<published>\bопубликова|\bпубликовал|\bвышл|\bвыш[ел]\b)",
+    r"(?P<got>\bполучил|\bполучали)",
+    r"(?P<total>\bвсего\b)",
+]))
+
+FEATURES = (
+    "creator", "hours", "window", "threshold", "metric", "unsupported",
+    "creators", "snapshots", "negative", "days", "growth", "howmuch",
+    "distinct", "sum", "published", "got", "total", "ambiguous",
+)
+FEATURE_BITS = {name: 1 << i for i, name in enumerate(FEATURES)}
+
+
+def _mask(names) -> int:
+    mask = 0
+    for name in names:
+        mask |= FEATURE_BITS[name]
+    return mask
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase Cyrillic, fold 'ё', collapse whitespace and join digit groups ("10 000").
+
+    Latin text keeps its case: creator ids are case-sensitive.
+    """
+    text = re.sub(r"[А-ЯЁ]+", lambda m: m.group(0).lower(), question).replace("ё", "е").replace(" ", " ")
+    text = re.sub(r"\s+", " ", text).strip()
+    text = re.sub(r"(?<=\d)[ ,](?=\d{3}\b)", "", text)
+    return text
+
+
+def _month_number(word: str) -> int:
+    for stem, number in MONTHS.items():
+        if word.startswith(stem):
+            return number
+    raise ValueError(f"Unknown month: {word}")
+
+
+def _timestamp(day: date, hour: int = 0, minute: int = 0) -> str:
+    return f"{day.isoformat()} {hour:02d}:{minute:02d}:00+00"
+
+
+def _month_window(year: int, month: int):
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+@dataclass
+class Slots:
+    features: int = 0
+    creator_id: str = None
+    start: date = None
+    end: date = None
+    hours: tuple = None
+    cmp: str = None
+    threshold: int = None
+    metric: str = None
+    default_year: int = None
+
+    def params(self) -> dict:
+        params = {}
+        if self.creator_id is not None:
+            params["creator_id"] = self.creator_id
+        if self.start is not None:
+            if self.hours:
+                (h_from, m_from), (h_to, m_to) = self.hours
+                params["start"] = _timestamp(self.start, h_from, m_from)
+                params["end"] = _timestamp(self.start, h_to, m_to)
+            else:
+                params["start"] = _timestamp(self.start)
+                params["end"] = _timestamp(self.end)
+        if self.threshold is not None:
+            params["threshold"] = self.threshold
+        return params
+
+
+def extract_slots(text: str, default_year: int = 2025) -> Slots:
+    """Single pass over a normalized question collecting slots and intent features.
+
+    A second threshold, window or hour range, a second creator or metric
+    that differs from the first, or a bare id after the creator, sets the "ambiguous" feature: templates
+    hold one value per slot, so such questions are left to the LLM. Raises
+    ValueError for impossible dates ("31 февраля").
+    """
+    slots = Slots(default_year=default_year)
+    features = 0
+
+    for match in TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        slot = "window" if kind in ("range", "date", "month") else kind
+        if slot in ("threshold", "hours", "window") and features & FEATURE_BITS[slot]:
+            features |= FEATURE_BITS["ambiguous"]
+        if kind == "creator":
+            creator_id = match.group("creator_id")
+            if slots.creator_id not in (None, creator_id):
+                features |= FEATURE_BITS["ambiguous"]
+            slots.creator_id = creator_id
+        elif kind == "bare_id":
+            # An id without its own "креатор" word: a second creator ("креаторы с id X и с id Y").
+            kind = "ambiguous"
+        elif kind == "hours":
+            slots.hours = (
+                (int(match.group("h_from")), int(match.group("m_from"))),
+                (int(match.group("h_to")), int(match.group("m_to"))),
+            )
+        elif kind == "range":
+            month2 = _month_number(match.group("r_month2"))
+            year2 = int(match.group("r_year2") or match.group("r_year1") or default_year)
+            month1 = _month_number(match.group("r_month1")) if match.group("r_month1") else month2
+            year1 = int(match.group("r_year1") or year2)
+            slots.start = date(year1, month1, int(match.group("r_day1")))
+            slots.end = date(year2, month2, int(match.group("r_day2"))) + timedelta(days=1)
+            kind = "window"
+        elif kind == "date":
+            day = date(int(match.group("d_year") or default_year),
+                       _month_number(match.group("d_month")), int(match.group("d_day")))
+            slots.start, slots.end = day, day + timedelta(days=1)
+            kind = "window"
+        elif kind == "month":
+            slots.start, slots.end = _month_window(int(match.group("m_year")),
+                                                   _month_number(match.group("m_month")))
+            kind = "window"
+        elif kind == "threshold":
+            slots.cmp = COMPARISONS[re.sub(r"\s+", " ", match.group("cmp"))]
+            slots.threshold = int(match.group("number"))
+        elif kind == "metric":
+            metric = METRICS[match.group("metric_stem")]
+            if slots.metric not in (None, metric):
+                features |= FEATURE_BITS["ambiguous"]
+            slots.metric = metric
+        features |= FEATURE_BITS[kind]
+
+    slots.features = features
+    return slots
+
+
+@dataclass(frozen=True)
+class Template:
+    name: str
+    requires: tuple
+    sql: str
+    forbids: tuple = ()
+    require_mask: int = field(init=False, repr=False)
+    forbid_mask: int = field(init=False, repr=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "require_mask", _mask(self.requires))
+        object.__setattr__(self, "forbid_mask", _mask(self.forbids + ("unsupported", "ambiguous")))
+
+    def matches(self, features: int) -> bool:
+        return (features & self.require_mask) == self.require_mask and not features & self.forbid_mask
+
+
+@dataclass(frozen=True)
+class TemplateMatch:
+    name: str
+    sql: str
+    params: dict
+
+    def literal_sql(self) -> str:
+        return render_sql(self.sql, self.params)
+
+
+# Checked in order; the first template whose features are all present and
+# whose forbidden features are all absent wins. SQL uses :name bind
+# parameters; {metric} and {cmp} are filled from validated slot values.
+TEMPLATES = (
+    Template("negative_deltas", ("snapshots", "negative"),
+             "SELECT COUNT(*) FROM video_snapshots WHERE delta_{metric}_count < 0;",
+             forbids=("creator", "window")),
+    Template("creator_hourly_growth", ("creator", "window", "hours", "growth"),
+             "SELECT COALESCE(SUM(vs.delta_{metric}_count), 0) FROM video_snapshots vs "
+             "JOIN videos v ON vs.video_id = v.id WHERE v.creator_id = :creator_id "
+             "AND vs.created_at >= :start AND vs.created_at <= :end;",
+             forbids=("distinct", "negative")),
+    Template("creator_growth", ("creator", "window", "growth", "howmuch"),
+             "SELECT COALESCE(SUM(vs.delta_{metric}_count), 0) FROM video_snapshots vs "
+             "JOIN videos v ON vs.video_id = v.id WHERE v.creator_id = :creator_id "
+             "AND vs.created_at >= :start AND vs.created_at < :end;",
+             forbids=("hours", "negative")),
+    Template("growth", ("window", "growth", "howmuch"),
+             "SELECT COALESCE(SUM(delta_{metric}_count), 0) FROM video_snapshots "
+             "WHERE created_at >= :start AND created_at < :end;",
+             forbids=("creator", "hours", "negative")),
+    Template("distinct_growth", ("window", "growth", "distinct"),
+             "SELECT COUNT(DISTINCT video_id) FROM video_snapshots "
+             "WHERE created_at >= :start AND created_at < :end AND delta_{metric}_count > 0;",
+             forbids=("creator", "creators", "hours", "howmuch", "negative")),
+    Template("creator_active_days", ("creator", "window", "days"),
+             "SELECT COUNT(DISTINCT DATE(video_created_at)) FROM videos WHERE creator_id = :creator_id "
+             "AND video_created_at >= :start AND video_created_at < :end;",
+             forbids=("hours", "threshold")),
+    Template("creator_published", ("creator", "window"),
+             "SELECT COUNT(*) FROM videos WHERE creator_id = :creator_id "
+             "AND video_created_at >= :start AND video_created_at < :end;",
+             forbids=("hours", "threshold", "growth", "sum", "days")),
+    Template("creator_threshold", ("creator", "threshold", "metric"),
+             "SELECT COUNT(*) FROM videos WHERE creator_id = :creator_id AND {metric}_count {cmp} :threshold;",
+             forbids=("window", "growth", "sum")),
+    Template("distinct_creators_threshold", ("creators", "threshold", "metric"),
+             "SELECT COUNT(DISTINCT creator_id) FROM videos WHERE {metric}_count {cmp} :threshold;",
+             forbids=("creator", "window", "growth")),
+    Template("published_sum", ("window", "sum", "metric"),
+             "SELECT COALESCE(SUM({metric}_count), 0) FROM videos "
+             "WHERE video_created_at >= :start AND video_created_at < :end;",
+             forbids=("creator", "growth", "hours", "threshold")),
+    Template("published_window", ("window", "published"),
+             "SELECT COUNT(*) FROM videos WHERE video_created_at >= :start AND video_created_at < :end;",
+             forbids=("creator", "creators", "growth", "hours", "threshold", "sum", "days", "metric",
+                      "distinct")),
+    Template("threshold", ("threshold", "metric"),
+             "SELECT COUNT(*) FROM videos WHERE {metric}_count {cmp} :threshold;",
+             forbids=("creator", "creators", "window", "growth", "sum", "snapshots")),
+    Template("got_metric", ("got", "metric"),
+             "SELECT COUNT(*) FROM videos WHERE {metric}_count > 0;",
+             forbids=("creator", "window", "threshold", "growth", "sum", "snapshots", "distinct")),
+    Template("creator_videos", ("creator",),
+             "SELECT COUNT(*) FROM videos WHERE creator_id = :creator_id;",
+             forbids=("window", "threshold", "growth", "sum", "metric", "days", "snapshots")),
+    Template("total_snapshots", ("snapshots", "total"),
+             "SELECT COUNT(*) FROM video_snapshots;",
+             forbids=("creator", "window", "threshold", "negative", "metric")),
+    Template("total_videos", ("total",),
+             "SELECT COUNT(*) FROM videos;",
+             forbids=("creator", "creators", "window", "threshold", "metric", "snapshots",
+                      "growth", "sum", "days", "distinct")),
+)
+
+# Formatted SQL -> (template name, metric, comparison) for every slot value,
+# so other executors (columnar.py) can recognise a template intent from the
+# (sql, params) pair that the SQL cache stores.
+TEMPLATE_INTENTS = {}
+for _template in TEMPLATES:
+    for _metric in dict.fromkeys(METRICS.values()):
+        for _cmp in dict.fromkeys(COMPARISONS.values()):
+            TEMPLATE_INTENTS.setdefault(_template.sql.format(metric=_metric, cmp=_cmp),
+                                        (_template.name, _metric, _cmp))
+
+# Index: for every feature present in a question only the templates that
+# require it are candidates, so most questions check one or two entries.
+_INDEX = {}
+for _position, _template in enumerate(TEMPLATES):
+    for _name in _template.requires:
+        _INDEX.setdefault(FEATURE_BITS[_name], []).append((_position, _template))
+
+
+def _candidates(features: int):
+    seen = {}
+    bit = 1
+    while bit <= features:
+        if features & bit:
+            for position, template in _INDEX.get(bit, ()):
+                seen[position] = template
+        bit <<= 1
+    return [seen[position] for position in sorted(seen)]
+
+
+def match_template(question: str, default_year: int = 2025) -> TemplateMatch | None:
+    try:
+        slots = extract_slots(normalize_question(question), default_year)
+    except ValueError:
+        return None
+    for template in _candidates(slots.features):
+        if template.matches(slots.features):
+            sql = template.sql.format(metric=slots.metric or "views", cmp=slots.cmp or ">")
+            return TemplateMatch(template.name, sql, slots.params())
+    return None
+
+
+def _literal(value) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def render_sql(sql: str, params: dict) -> str:
+    """Inline bind parameters as SQL literals (for logging, caching and plain execution)."""
+    if not params:
+        return sql
+    return re.sub(r":(\w+)", lambda m: _literal(params[m.group(1)]) if m.group(1) in params else m.group(0), sql)
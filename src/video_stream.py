@@ -0,0 +1,185 @@
+import io
+import json
+import os
+import re
+
+
+CHUNK_SIZE = 1 << 16
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+
+_WHITESPACE = re.compile(r"\s*")
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """Buffered text reader that decodes one JSON value at a time.
+
+    Only the unread tail of the file is kept in memory, so a value is
+    never bigger than the largest single video with its snapshots.
+    """
+
+    def __init__(self, f, chunk_size: int = CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int = None) -> bool:
+        data = self.f.read(size or self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed JSON: expected {char!r}, found {found!r}")
+        self.pos += 1
+
+    def decode(self):
+        self.peek()
+        read_size = self.chunk_size
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # A number that ends the buffer may continue in the next chunk.
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self._fill(read_size):
+                continue
+            read_size *= 2
+
+
+def _iter_array(reader: _Reader):
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+    while True:
+        yield reader.decode()
+        char = reader.peek()
+        reader.pos += 1
+        if char == "]":
+            return
+        if char != ",":
+            raise ValueError(f"Malformed JSON array: unexpected {char!r}")
+
+
+def _iter_values(reader: _Reader):
+    while reader.peek():
+        yield reader.decode()
+
+
+def _iter_object(reader: _Reader):
+    """Stream the "videos" array of a top-level object.
+
+    Keys other than "videos" are decoded and kept; if the object turns out
+    to be a plain video record (NDJSON saved with a .json name), it is
+    yielded and the rest of the file is read as NDJSON.
+    """
+    reader.expect("{")
+    other_keys = {}
+    found_videos = False
+    if reader.peek() == "}":
+        reader.pos += 1
+    else:
+        while True:
+            key = reader.decode()
+            reader.expect(":")
+            if key == "videos":
+                found_videos = True
+                yield from _iter_array(reader)
+            else:
+                other_keys[key] = reader.decode()
+            char = reader.peek()
+            reader.pos += 1
+            if char == "}":
+                break
+            if char != ",":
+                raise ValueError(f"Malformed JSON object: unexpected {char!r}")
+
+    if found_videos:
+        return
+    if "id" in other_keys:
+        yield other_keys
+        yield from _iter_values(reader)
+        return
+    raise ValueError("JSON format not recognized. Expected array or object with 'videos' key.")
+
+
+class _HashingFile(io.RawIOBase):
+    """Binary file wrapper that feeds every byte read into a hashlib digest"""
+
+    def __init__(self, f, digest):
+        self.f = f
+        self.digest = digest
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        read = self.f.readinto(b)
+        if read:
+            self.digest.update(memoryview(b)[:read])
+        return read
+
+    def close(self):
+        self.f.close()
+        super().close()
+
+
+def _open_text(json_path, digest=None):
+    if digest is None:
+        return open(json_path, "r", encoding="utf-8")
+    raw = _HashingFile(open(json_path, "rb", buffering=0), digest)
+    return io.TextIOWrapper(io.BufferedReader(raw), encoding="utf-8")
+
+
+def iter_videos(json_path, chunk_size: int = CHUNK_SIZE, offset: int = 0, digest=None):
+    """Yield video dicts from a bare array, a {"videos": [...]} object or NDJSON.
+
+    ``offset`` (NDJSON only) starts reading at a byte position, e.g. where a
+    previous sync stopped. ``digest`` (a hashlib object) is updated with every
+    byte of the file, so a full load fingerprints its input in the same pass.
+    """
+    ndjson = os.path.splitext(json_path)[1].lower() in NDJSON_EXTENSIONS
+    if offset and digest is not None:
+        raise ValueError("A digest covers the whole file and cannot start from an offset.")
+    with _open_text(json_path, digest) as f:
+        if offset:
+            if not ndjson:
+                raise ValueError("Reading from an offset is only supported for NDJSON files.")
+            f.seek(offset)
+        reader = _Reader(f, chunk_size)
+
+        if ndjson:
+            yield from _iter_values(reader)
+        else:
+            first = reader.peek()
+            if first == "[":
+                yield from _iter_array(reader)
+            elif first == "{":
+                yield from _iter_object(reader)
+            elif first:
+                raise ValueError("JSON format not recognized. Expected array or object with 'videos' key.")
+
+        if digest is not None:
+            # Hash whatever follows the last value (trailing whitespace).
+            while f.buffer.read(chunk_size):
+                pass